@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+# The renderer is timed on an offscreen surface, so pygame must never try to open a real window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+from board import Board
+from board_renderer import BoardRenderer
+from learner import Q_Learner
+from trainer import Trainer
+from maze import generate_for_board
+from sweep import parse_ints
+
+# Measurements where a bigger number is better, everything else (times) is better when smaller
+HIGHER_IS_BETTER = ('steps_per_second', 'updates_per_second', 'actions_per_second', 'solved')
+
+# Best of a few runs of func, in seconds, the minimum is the run least disturbed by the rest of the machine
+def best_time(func, repeats=3):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def make_board(map_size, seed):
+    board = Board(map_size=map_size)
+    generate_for_board(board, seed=seed)
+    return board
+
+def make_learner(board, seed):
+    return Q_Learner(board.total_states, board.total_actions, inp_seed_OPT=seed)
+
+# Board.move_player with random actions, and Trainer.run_steps end to end
+def bench_environment(map_size, num_steps=200000, seed=0, repeats=3):
+    board = make_board(map_size, seed)
+    actions = np.random.default_rng(seed).integers(0, board.total_actions, size=num_steps).tolist()
+
+    def move():
+        board.set_player_location(board.start_location)
+        for action in actions:
+            board.move_player(action)
+
+    def train():
+        trainer = Trainer(board, make_learner(board, seed), max_steps=4 * board.total_states)
+        trainer.run_steps(num_steps)
+
+    return {
+        'move_player_steps_per_second': num_steps / best_time(move, repeats),
+        'trainer_steps_per_second': num_steps / best_time(train, repeats)
+    }
+
+# Q_Learner.train_step (update plus picking the next action) and test_step on random transitions
+def bench_learner(map_size, num_updates=200000, seed=0, repeats=3):
+    board = make_board(map_size, seed)
+    rng = np.random.default_rng(seed)
+    states = rng.integers(0, board.total_states, size=num_updates).tolist()
+    rewards = rng.choice(list(board.weight_map.values()), size=num_updates).tolist()
+
+    def train():
+        learner = make_learner(board, seed)
+        learner.test_step(states[0])
+        learner.train_state = states[0]
+        learner.train_action = 0
+        for state, reward in zip(states, rewards):
+            learner.train_step(state, reward)
+
+    def act():
+        learner = make_learner(board, seed)
+        for state in states:
+            learner.test_step(state)
+
+    return {
+        'train_step_updates_per_second': num_updates / best_time(train, repeats),
+        'test_step_actions_per_second': num_updates / best_time(act, repeats)
+    }
+
+# Episodes until the greedy path is as short as the shortest path, on the same seeded mazes every time
+def bench_convergence(map_size, seeds=range(10), max_episodes=2000):
+    episodes = []
+    start = time.perf_counter()
+    for seed in seeds:
+        board = make_board(map_size, seed)
+        stats = Trainer(board, make_learner(board, seed), max_steps=4 * board.total_states).run_until_optimal(max_episodes)
+        if stats and stats[-1].get('regret') == 0:
+            episodes.append(len(stats))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mazes': len(seeds),
+        'solved': len(episodes),
+        'mean_episodes_to_optimal': float(np.mean(episodes)) if episodes else None,
+        'median_episodes_to_optimal': float(np.median(episodes)) if episodes else None,
+        'convergence_wall_time': elapsed
+    }
+
+# Frame time of BoardRenderer.draw_map on an offscreen surface, and of draw_dirty after a single move
+def bench_render(map_size, frames=20, seed=0, board_length=600):
+    board = make_board(map_size, seed)
+    renderer = BoardRenderer(board, tile_size=max(1, board_length // map_size), max_pixels=board_length)
+    canvas = pygame.Surface((board_length, board_length))
+    results = {}
+    for draw_weights in (False, True):
+        label = 'weights' if draw_weights else 'plain'
+        renderer.draw_map(canvas, draw_weights) # warm up the font and text cache
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            renderer.draw_map(canvas, draw_weights)
+        results[f'draw_map_{label}_ms'] = (time.perf_counter() - start) / frames * 1000
+
+        start = time.perf_counter()
+        for frame in range(frames):
+            board.move_player(frame % board.total_actions)
+            renderer.draw_dirty(canvas, draw_weights)
+        results[f'draw_dirty_{label}_ms'] = (time.perf_counter() - start) / frames * 1000
+    return results
+
+# Headless startup, run in a fresh interpreter: time to import the environment, learner, and trainer, and from starting
+# the interpreter's work to the first training step. Also checks the headless path never loads pygame.
+STARTUP_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+from board import Board
+from learner import Q_Learner
+from trainer import Trainer
+imported = time.perf_counter()
+board = Board()
+trainer = Trainer(board, Q_Learner(board.total_states, board.total_actions))
+trainer.step()
+trainer.step()
+first_step = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_step_ms': (first_step - start) * 1000, 'loads_pygame': 'pygame' in sys.modules}))
+"""
+
+def bench_startup(repeats=3):
+    best = None
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        run = json.loads(output.stdout.strip().splitlines()[-1])
+        if best is None or run['first_step_ms'] < best['first_step_ms']:
+            best = run
+    return {
+        'startup_import_ms': best['import_ms'],
+        'startup_first_step_ms': best['first_step_ms'],
+        'startup_loads_pygame': best['loads_pygame']
+    }
+
+# Commit the benchmark ran on, so saved results can be lined up with the history
+def git_commit():
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(map_sizes, convergence_map_sizes, num_steps=200000, convergence_seeds=range(10), frames=20, repeats=3):
+    pygame.init()
+    results = {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'startup': bench_startup(repeats),
+        'sizes': {}
+    }
+    print("startup: " + ", ".join(f"{name}={value}" for name, value in results['startup'].items()))
+    for map_size in sorted(set(map_sizes) | set(convergence_map_sizes)):
+        size_results = {}
+        if map_size in map_sizes:
+            size_results.update(bench_environment(map_size, num_steps, repeats=repeats))
+            size_results.update(bench_learner(map_size, num_steps, repeats=repeats))
+            size_results.update(bench_render(map_size, frames))
+        if map_size in convergence_map_sizes:
+            size_results.update(bench_convergence(map_size, convergence_seeds))
+        results['sizes'][str(map_size)] = size_results
+        print(f"{map_size}x{map_size}: " + ", ".join(f"{name}={value:.4g}" for name, value in size_results.items() if isinstance(value, float)))
+    pygame.quit()
+    return results
+
+# Print how each measurement changed between two saved runs, positive percentages are improvements
+def compare_results(old, new):
+    print(f"Comparing {old.get('commit')} -> {new.get('commit')}")
+    groups = [('all', old.get('startup', {}), new.get('startup', {}))]
+    groups += [(size, old['sizes'].get(size, {}), new_values) for size, new_values in new['sizes'].items()]
+    for label, old_values, new_values in groups:
+        for name, value in new_values.items():
+            old_value = old_values.get(name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(old_value, (int, float)) or old_value == 0:
+                continue
+            change = (value - old_value) / old_value
+            if not any(name.endswith(suffix) for suffix in HIGHER_IS_BETTER):
+                change = -change
+            print(f"  {label:>5} {name:<34} {old_value:>12.4g} -> {value:<12.4g} {change:+.1%}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the environment, learner, and renderer")
+    parser.add_argument("--map-sizes", type=parse_ints, default=[10, 50, 100], help="comma separated map sizes for the speed and render benchmarks")
+    parser.add_argument("--convergence-map-sizes", type=parse_ints, default=[10, 15], help="comma separated map sizes to measure episodes to convergence on")
+    parser.add_argument("--steps", type=int, default=200000, help="steps and updates timed per speed benchmark")
+    parser.add_argument("--mazes", type=int, default=10, help="seeded mazes per size for the convergence benchmark")
+    parser.add_argument("--frames", type=int, default=20, help="frames timed per render benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="runs of each speed benchmark, the best one counts")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.map_sizes, args.convergence_map_sizes, args.steps, range(args.mazes), args.frames, args.repeats)
+    with open(args.output, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"Wrote results to {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare) as old_file:
+            compare_results(json.load(old_file), results)
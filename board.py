@@ -1,151 +1,170 @@
-import pygame
+import numpy as np
+
+# Integer codes used for tiles in Board.tiles, TILE_NAMES[code] gives the name back
+TILE_CODES = {
+    'floor': 0,
+    'wall': 1,
+    'goal': 2
+}
+TILE_NAMES = ('floor', 'wall', 'goal')
+
+# Reward for moving onto each kind of tile, every Board starts with its own copy
+DEFAULT_WEIGHT_MAP = {
+    'wall': -1000,
+    'floor': -1,
+    'goal': 100
+}
+
+# Direction of each action in (row, col): 0 = right, 1 = up, 2 = left, 3 = down
+ACTION_OFFSETS = ((0, 1), (-1, 0), (0, -1), (1, 0))
 
 class Board:
 
-    def __init__(self, tile_size = 60, map_size = 10, offset_x = 0, offset_y = 0, board_name="Board"):
+    # The maze environment: tiles, rewards, the precomputed transition table, and where the player is.
+    # It only needs NumPy, so training scripts and worker processes never load pygame. Drawing lives in board_renderer.py.
+
+    # Large maps skip the nested-list copies of the transition table, which would cost far more memory than the arrays
+    list_lookup_states = 65536
+
+    def __init__(self, map_size = 10, start_location=None, goal_location=None):
 
         # Define map sizes
-        self.tile_size = tile_size
         self.map_size = map_size
-        
-        self.offset_x = offset_x
-        self.offset_y = offset_y
-
-        # Define colors for entities
-        self.colors = {
-            'wall': (70, 70, 70),
-            'floor': (255, 255, 255),
-            'player': (0, 255, 0),
-            'goal': (255, 0, 0)
-        }
-
-        self.weight_map = {
-            'wall': -1000,
-            'floor': -1,
-            'goal': 100
-        }
+        self.total_states = map_size * map_size
+        self.total_actions = len(ACTION_OFFSETS)
+
+        self.weight_map = dict(DEFAULT_WEIGHT_MAP)
+
+        # Default to the top left floor tile and a goal in the bottom wall, one tile in from the right
+        self.start_location = tuple(start_location) if start_location is not None else (1, 1)
+        self.goal_location = tuple(goal_location) if goal_location is not None else (map_size - 1, map_size - 2)
+
+        # Goes up every time the map or rewards change, so renderers know to redraw everything
+        self.map_version = 0
 
         self.gen_new_map()
-        self.assign_weights()
-        self.font = pygame.font.SysFont("Arial", 12, bold=False)
 
     def gen_new_map(self):
         
         # Create game map with all floors
-        self.game_map = [['floor' for _ in range(self.map_size)] for _ in range(self.map_size)]
+        self.tiles = np.full((self.map_size, self.map_size), TILE_CODES['floor'], dtype=np.uint8)
 
         # Add walls to game map
-        for i in range(self.map_size):
-            self.game_map[0][i] = 'wall'
-            self.game_map[self.map_size - 1][i] = 'wall'
-            self.game_map[i][0] = 'wall'
-            self.game_map[i][self.map_size - 1] = 'wall'
+        self.tiles[0, :] = TILE_CODES['wall']
+        self.tiles[self.map_size - 1, :] = TILE_CODES['wall']
+        self.tiles[:, 0] = TILE_CODES['wall']
+        self.tiles[:, self.map_size - 1] = TILE_CODES['wall']
 
         # Place player and goal
-        self.player_location = (1, 1)
-        self.game_map[9][8] = 'goal'
+        self.set_player_location(self.start_location)
+        self.tiles[self.goal_location] = TILE_CODES['goal']
+        self.assign_weights()
 
+    # Rebuild the reward array and the (state, action) transition table from the tile codes
     def assign_weights(self):
-        self.weights = [[self.weight_map[tile] for tile in row] for row in self.game_map]
-        self.custom_weight_map = [[None for _ in row] for row in self.game_map]
+        reward_lookup = np.array([self.weight_map[name] for name in TILE_NAMES], dtype=np.int64)
+        self.weights = reward_lookup[self.tiles]
+        self.map_version += 1
+
+        # Every move is precomputed, so move_player only has to look up where it lands and what it earns
+        states = np.arange(self.total_states)
+        rows, cols = np.divmod(states, self.map_size)
+        flat_tiles = self.tiles.ravel()
+        start_state = self.location_to_state(self.start_location)
+
+        self.next_states = np.empty((self.total_states, self.total_actions), dtype=np.int64)
+        self.transition_rewards = np.empty((self.total_states, self.total_actions), dtype=np.int64)
+        self.transition_done = np.empty((self.total_states, self.total_actions), dtype=bool)
+        for action, (d_row, d_col) in enumerate(ACTION_OFFSETS):
+            new_rows = rows + d_row
+            new_cols = cols + d_col
+
+            # Moving off the edge of the map counts as walking into a wall
+            inside = (new_rows >= 0) & (new_rows < self.map_size) & (new_cols >= 0) & (new_cols < self.map_size)
+            proposed = np.where(inside, new_rows * self.map_size + new_cols, states)
+            tile = np.where(inside, flat_tiles[proposed], TILE_CODES['wall'])
+
+            # Walls leave the player where they were, the goal sends them back to the start
+            next_state = np.where(tile == TILE_CODES['wall'], states, proposed)
+            next_state[tile == TILE_CODES['goal']] = start_state
+
+            self.next_states[:, action] = next_state
+            self.transition_rewards[:, action] = reward_lookup[tile]
+            self.transition_done[:, action] = tile == TILE_CODES['goal']
+
+        # Python lists index faster than numpy arrays for the one-at-a-time lookups in move_player
+        if self.total_states <= self.list_lookup_states:
+            self.next_state_list = self.next_states.tolist()
+            self.transition_reward_list = self.transition_rewards.tolist()
+            self.transition_done_list = self.transition_done.tolist()
+        else:
+            self.next_state_list = None
+            self.transition_reward_list = None
+            self.transition_done_list = None
+
+    def location_to_state(self, location):
+        return location[0] * self.map_size + location[1]
+
+    def state_to_location(self, state):
+        return divmod(state, self.map_size)
+
+    def get_state(self):
+        return self.player_state
 
     def get_player_location(self):
         return self.player_location
     
     def set_player_location(self, location):
-        self.player_location = location
+        self.player_location = tuple(location)
+        self.player_state = self.location_to_state(location)
+
+    # The map as nested lists of tile names, kept for code that edits the map by hand
+    @property
+    def game_map(self):
+        return [[TILE_NAMES[code] for code in row] for row in self.tiles.tolist()]
 
     def get_game_map(self):
         return self.game_map
         
+    # Accepts either nested lists of tile names or an array of TILE_CODES
     def set_game_map(self, inp_map):
-        self.game_map = inp_map
+        if isinstance(inp_map, np.ndarray):
+            self.tiles = inp_map.astype(np.uint8)
+        else:
+            self.tiles = np.array([[TILE_CODES[tile] for tile in row] for row in inp_map], dtype=np.uint8)
         self.assign_weights()
 
-    def draw_map(self, canvas, draw_weights, custom_weight=None, direction=None):
-        pos = list(self.player_location)
-        for row in range(self.map_size):
-            for col in range(self.map_size):
-                tile = self.game_map[row][col]
-                color = self.colors[tile]
-                if((row, col) == self.player_location):
-                    color = self.colors['player']
-                pygame.draw.rect(canvas, color, 
-                                 (self.offset_x + col * self.tile_size,
-                                  self.offset_y + row * self.tile_size,
-                                  self.tile_size, self.tile_size))
-                
-                if draw_weights:
-                    
-                    if custom_weight is None:
-                        weight = self.weights[row][col]
-                        weight_text = self.font.render(str(weight), True, (0, 0, 0))
-                        text_rect = weight_text.get_rect(center=(self.offset_x + col * self.tile_size + self.tile_size // 2, self.offset_y + row * self.tile_size + self.tile_size // 2))
-                        canvas.blit(weight_text, text_rect)  # Blit the weight text onto the canvas
-                    
-                    else: # Using custom weights
-
-                        if(row == pos[0] and col == pos[1]):
-                            
-                            formatted_weight = "{:.4g}".format(custom_weight)
-                            
-                            if(direction == 0):
-                                formatted_weight = formatted_weight + " R"
-                            elif(direction == 1):
-                                formatted_weight = formatted_weight + " U"
-                            elif(direction == 2):
-                                formatted_weight = formatted_weight + " L"
-                            elif(direction == 3):
-                                formatted_weight = formatted_weight + " D"
-
-                            self.custom_weight_map[row][col] = formatted_weight
-                            weight = self.custom_weight_map[row][col]
-                            weight_text = self.font.render(weight, True, (0, 0, 0))
-                            text_rect = weight_text.get_rect(center=(self.offset_x + col * self.tile_size + self.tile_size // 2, self.offset_y + row * self.tile_size + self.tile_size // 2))
-                            canvas.blit(weight_text, text_rect)  # Blit the weight text onto the canvas
-
-                        else:
-
-                            weight = self.custom_weight_map[row][col]
-                            if weight is not None:
-                                weight_text = self.font.render(weight, True, (0, 0, 0))
-                                text_rect = weight_text.get_rect(center=(self.offset_x + col * self.tile_size + self.tile_size // 2, self.offset_y + row * self.tile_size + self.tile_size // 2))
-                                canvas.blit(weight_text, text_rect)  # Blit the weight text onto the canvas
-                                
-                    
-
-                    
-                        
-
-
-
     # Player movement functions
     def move_player(self, direction): # 0 = right, 1 = up, 2 = left, 3 = down
 
         # The player can move "into" a wall, but they will receive the penalty then get moved back out of it to where they previously were.
-        proposed_location = list(self.player_location)
-
-        # Calculate proposed move on the map
-        if(direction == 0):
-            proposed_location[1] += 1
-        elif(direction == 1):
-            proposed_location[0] -= 1
-        elif(direction == 2):
-            proposed_location[1] -= 1
-        elif(direction == 3):
-            proposed_location[0] += 1
-
-        # If there is a wall, overwrite the actual player position
-        if(self.game_map[proposed_location[0]][proposed_location[1]] == 'wall'):
-            reward = self.weights[proposed_location[0]][proposed_location[1]]
         # If the player finds the goal, they get the reward for it but can't stay (for training at least)
-        elif(self.game_map[proposed_location[0]][proposed_location[1]] == 'goal'):
-            self.player_location = (1, 1)
-            reward = self.weights[proposed_location[0]][proposed_location[1]]
+        state = self.player_state
+        if self.next_state_list is not None:
+            reward = self.transition_reward_list[state][direction]
+            self.player_state = self.next_state_list[state][direction]
         else:
-            # Move and assess reward
-            self.player_location = tuple(proposed_location)
-            reward = self.weights[proposed_location[0]][proposed_location[1]]
-        
-        # Will return reward once Q implemented
-        return reward
\ No newline at end of file
+            reward = self.transition_rewards.item(state, direction)
+            self.player_state = self.next_states.item(state, direction)
+        self.player_location = divmod(self.player_state, self.map_size)
+        return reward
+
+    # Environment step for training, returns (new state, reward, done)
+    # Unlike move_player, reaching the goal leaves the player standing on it and reports done=True,
+    # so the goal is a terminal state and the caller decides when the next episode starts
+    def step(self, direction):
+        state = self.player_state
+        if self.next_state_list is not None:
+            reward = self.transition_reward_list[state][direction]
+            done = self.transition_done_list[state][direction]
+            new_state = self.next_state_list[state][direction]
+        else:
+            reward = self.transition_rewards.item(state, direction)
+            done = self.transition_done.item(state, direction)
+            new_state = self.next_states.item(state, direction)
+        if done:
+            d_row, d_col = ACTION_OFFSETS[direction]
+            new_state = state + d_row * self.map_size + d_col
+        self.player_state = new_state
+        self.player_location = divmod(new_state, self.map_size)
+        return new_state, reward, done
@@ -0,0 +1,176 @@
+import pygame
+from board import TILE_NAMES
+from text_cache import shared_text_cache
+
+# Colors of each kind of tile and of the player, every renderer starts with its own copy
+DEFAULT_COLORS = {
+    'wall': (70, 70, 70),
+    'floor': (255, 255, 255),
+    'player': (0, 255, 0),
+    'goal': (255, 0, 0)
+}
+
+# Tiles smaller than this are drawn as one image with a pixel per tile instead of a rectangle each, too small for weights anyway
+MIN_RECT_TILE_SIZE = 8
+
+# Palette index of the player in that image, each tile's index is its code in Board.tiles
+PLAYER_INDEX = len(TILE_NAMES)
+
+class BoardRenderer:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Draws a Board onto a pygame surface: one rectangle per tile, with the tile's reward or the learner's latest
+    # Q-value written on it if asked. Only the tiles the player left or entered are redrawn between full draws.
+    # Large maps are drawn as a single image instead, shrunk to max_pixels if they don't fit at one pixel per tile.
+
+    def __init__(
+        self,
+        board, # Board to draw
+        tile_size=60, # width and height of a tile in pixels
+        offset_x=0, # where the top left corner of the board goes on the canvas
+        offset_y=0,
+        text_cache=None, # TextCache for the weight text, defaults to the shared one
+        max_pixels=None # most pixels the board can take up across, None for no limit
+    ):
+        self.board = board
+        self.tile_size = tile_size
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+        # Width of the board on the canvas, and whether it's drawn as one image (see draw_image())
+        self.pixel_size = board.map_size * tile_size
+        if max_pixels is not None:
+            self.pixel_size = min(self.pixel_size, max_pixels)
+        self.draw_as_image = tile_size < MIN_RECT_TILE_SIZE or self.pixel_size < board.map_size * tile_size
+        self.image = None
+
+        # Define colors for entities
+        self.colors = dict(DEFAULT_COLORS)
+
+        # The font is only loaded once the board is drawn, so a renderer can be made before pygame.init()
+        self.font = None
+        self.text_cache = text_cache if text_cache is not None else shared_text_cache
+
+        # What the last draw showed, to work out what needs drawing next time
+        self.custom_weight_map = None
+        self.drawn_map_version = None
+        self.drawn_settings = None
+        self.drawn_player_location = None
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~ ######
+    ###### Drawing Functions ######
+    ###### ~~~~~~~~~~~~~~~~~ ######
+
+    # Rectangle a tile covers on the canvas, shrunk boards give every tile at least one pixel
+    def tile_rect(self, row, col):
+        map_size = self.board.map_size
+        left = col * self.pixel_size // map_size
+        top = row * self.pixel_size // map_size
+        width = max(1, (col + 1) * self.pixel_size // map_size - left)
+        height = max(1, (row + 1) * self.pixel_size // map_size - top)
+        return pygame.Rect(self.offset_x + left, self.offset_y + top, width, height)
+
+    # Draw a single tile (and its weight if asked) and return the rectangle it covers
+    def draw_tile(self, canvas, row, col, draw_weights, use_custom_weights):
+        board = self.board
+        tile = TILE_NAMES[board.tiles[row, col]]
+        color = self.colors[tile]
+        if((row, col) == board.player_location):
+            color = self.colors['player']
+        rect = self.tile_rect(row, col)
+        pygame.draw.rect(canvas, color, rect)
+
+        if draw_weights and not self.draw_as_image:
+            if use_custom_weights:
+                weight = self.custom_weight_map[row][col]
+            else:
+                weight = str(board.weights[row, col])
+            if weight is not None:
+                weight_text = self.text_cache.render(self.font, weight, (0, 0, 0))
+                text_rect = weight_text.get_rect(center=rect.center)
+                canvas.blit(weight_text, text_rect)  # Blit the weight text onto the canvas
+
+        return rect
+
+    # Start over with no Q-values written on the tiles whenever the board's map changes
+    def check_map_version(self):
+        if self.drawn_map_version != self.board.map_version:
+            self.custom_weight_map = [[None for _ in range(self.board.map_size)] for _ in range(self.board.map_size)]
+
+    # Write the Q-table value that brought the player to its current tile onto that tile
+    def record_custom_weight(self, custom_weight, direction):
+        formatted_weight = "{:.4g}".format(custom_weight)
+
+        if(direction == 0):
+            formatted_weight = formatted_weight + " R"
+        elif(direction == 1):
+            formatted_weight = formatted_weight + " U"
+        elif(direction == 2):
+            formatted_weight = formatted_weight + " L"
+        elif(direction == 3):
+            formatted_weight = formatted_weight + " D"
+
+        row, col = self.board.player_location
+        self.custom_weight_map[row][col] = formatted_weight
+
+    # Draw the whole map as one 8-bit image with a pixel per tile (the tile codes are the palette indices), scaled to the board's size
+    def draw_image(self, canvas):
+        map_size = self.board.map_size
+        if self.image is None:
+            self.image = pygame.Surface((map_size, map_size), depth=8)
+            palette = [self.colors[name] for name in TILE_NAMES] + [self.colors['player']]
+            self.image.set_palette(palette + [(0, 0, 0)] * (256 - len(palette)))
+
+        pixels = self.board.tiles.copy()
+        pixels[self.board.player_location] = PLAYER_INDEX
+        pygame.surfarray.blit_array(self.image, pixels.T) # surfarray indexes (x, y)
+        image = self.image
+        if self.pixel_size != map_size:
+            image = pygame.transform.scale(image, (self.pixel_size, self.pixel_size))
+        canvas.blit(image, (self.offset_x, self.offset_y))
+
+        # A shrunk image can drop the player's pixel, so it's drawn over the top
+        self.draw_tile(canvas, *self.board.player_location, False, False)
+
+    # Draw every tile, returns the rectangle covering the whole board
+    def draw_map(self, canvas, draw_weights, custom_weight=None, direction=None):
+        if self.font is None:
+            self.font = pygame.font.SysFont("Arial", 12, bold=False)
+        self.check_map_version()
+
+        use_custom_weights = custom_weight is not None
+        if draw_weights and use_custom_weights:
+            self.record_custom_weight(custom_weight, direction)
+
+        if self.draw_as_image:
+            self.draw_image(canvas)
+        else:
+            for row in range(self.board.map_size):
+                for col in range(self.board.map_size):
+                    self.draw_tile(canvas, row, col, draw_weights, use_custom_weights)
+
+        self.drawn_map_version = self.board.map_version
+        self.drawn_settings = (draw_weights, use_custom_weights)
+        self.drawn_player_location = self.board.player_location
+        return pygame.Rect(self.offset_x, self.offset_y, self.pixel_size, self.pixel_size)
+
+    # Only redraw the tiles that changed since the last draw (the old and new player tiles), returns the rectangles drawn
+    # Falls back to draw_map() when the map or the weight display settings changed
+    def draw_dirty(self, canvas, draw_weights, custom_weight=None, direction=None):
+        use_custom_weights = custom_weight is not None
+        if self.drawn_map_version != self.board.map_version or self.drawn_settings != (draw_weights, use_custom_weights):
+            return [self.draw_map(canvas, draw_weights, custom_weight, direction)]
+
+        if draw_weights and use_custom_weights:
+            self.record_custom_weight(custom_weight, direction)
+
+        player_location = self.board.player_location
+        rects = [self.draw_tile(canvas, *player_location, draw_weights, use_custom_weights)]
+        if self.drawn_player_location != player_location:
+            rects.append(self.draw_tile(canvas, *self.drawn_player_location, draw_weights, use_custom_weights))
+        self.drawn_player_location = player_location
+        return rects
@@ -0,0 +1,178 @@
+import json
+import math
+import os
+import struct
+import numpy as np
+from board import Board
+from learner import Q_Learner
+from qtable import SparseQTable
+
+# Checkpoint file layout:
+#   fixed header: magic, format version, length of the metadata
+#   metadata: UTF-8 JSON with the board settings, learner preferences, counters, and where each array lives
+#   arrays: raw C-ordered bytes, each starting on a 64 byte boundary after the metadata
+# Keeping the arrays raw means a checkpoint can be opened with np.memmap, so a huge Q-table is only read as it's used.
+
+CHECKPOINT_MAGIC = b'QLCK'
+CHECKPOINT_VERSION = 1
+HEADER = struct.Struct('<4sIQ')
+ALIGNMENT = 64
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+# Save a board, a learner, and any training counters (a dict of JSON-friendly values, see Trainer.get_counters()) to one file
+# The file is written next to the target and renamed over it, so a checkpoint that is currently memory-mapped stays valid
+def save_checkpoint(path, board, learner, counters=None):
+    arrays = {'tiles': board.tiles}
+    sparse = isinstance(learner.Q_table, SparseQTable)
+    if sparse:
+        # Only the rows that were allocated, and which state each one belongs to
+        states = np.array(learner.Q_table.visited_states(), dtype=np.int64)
+        arrays['q_states'] = states
+        arrays['q_rows'] = learner.Q_table.get_rows(states)
+    else:
+        arrays['q_table'] = learner.Q_table
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = align(offset)
+        layout[name] = {'dtype': np.dtype(array.dtype).str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    metadata = {
+        'board': {
+            'map_size': board.map_size,
+            'start_location': list(board.start_location),
+            'goal_location': list(board.goal_location),
+            'player_location': list(board.get_player_location()),
+            'weight_map': board.weight_map
+        },
+        'learner': {
+            'total_states': learner.total_states,
+            'total_actions': learner.total_actions,
+            'learning_rate': learner.learning_rate,
+            'rewards_rate': learner.rewards_rate,
+            'exploration_rate': learner.exploration_rate,
+            'exploration_rate_decay': learner.exploration_rate_decay,
+            'sparse': sparse,
+            'rng_state': learner.rng.bit_generator.state
+        },
+        'counters': counters or {},
+        'arrays': layout
+    }
+    metadata_bytes = json.dumps(metadata).encode('utf-8')
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as checkpoint_file:
+        checkpoint_file.write(HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(metadata_bytes)))
+        checkpoint_file.write(metadata_bytes)
+        data_start = align(HEADER.size + len(metadata_bytes))
+        for name, array in arrays.items():
+            checkpoint_file.seek(data_start + layout[name]['offset'])
+            checkpoint_file.write(memoryview(np.ascontiguousarray(array)).cast('B'))
+        checkpoint_file.truncate(data_start + offset)
+    os.replace(temp_path, path)
+
+class Checkpoint:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # A checkpoint opened from disk. Only the header is read up front, the arrays are memory-mapped.
+    # The default copy-on-write mode lets a restored learner keep training on its memory-mapped Q-table
+    # without touching the file, use mmap_mode='r' to only look at it.
+
+    def __init__(
+        self,
+        path, # checkpoint written by save_checkpoint()
+        mmap_mode='c' # np.memmap mode for the arrays: 'c' copy-on-write, 'r' read only, 'r+' writes go to the file
+    ):
+        self.path = path
+        with open(path, 'rb') as checkpoint_file:
+            magic, version, metadata_length = HEADER.unpack(checkpoint_file.read(HEADER.size))
+            if magic != CHECKPOINT_MAGIC:
+                raise ValueError(f"{path} is not a Q-learner checkpoint")
+            if version != CHECKPOINT_VERSION:
+                raise ValueError(f"{path} is checkpoint version {version}, only version {CHECKPOINT_VERSION} can be read")
+            self.metadata = json.loads(checkpoint_file.read(metadata_length).decode('utf-8'))
+
+        data_start = align(HEADER.size + metadata_length)
+        self.arrays = {}
+        for name, info in self.metadata['arrays'].items():
+            shape = tuple(info['shape'])
+            if math.prod(shape) == 0:
+                self.arrays[name] = np.zeros(shape, dtype=info['dtype'])
+            else:
+                # A plain ndarray view of the map skips np.memmap's per-operation overhead in the training loop
+                mapped = np.memmap(path, dtype=info['dtype'], mode=mmap_mode, offset=data_start + info['offset'], shape=shape)
+                self.arrays[name] = mapped.view(np.ndarray)
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    @property
+    def board_settings(self):
+        return self.metadata['board']
+
+    @property
+    def learner_settings(self):
+        return self.metadata['learner']
+
+    @property
+    def counters(self):
+        return self.metadata['counters']
+
+    ###### ~~~~~~~~~~~~~~~~ ######
+    ###### Helper Functions ######
+    ###### ~~~~~~~~~~~~~~~~ ######
+
+    # Put the saved map, rewards, and player location on an existing board of the same size
+    def apply_to_board(self, board):
+        settings = self.board_settings
+        if board.map_size != settings['map_size']:
+            raise ValueError(f"checkpoint is for a {settings['map_size']}x{settings['map_size']} map, the board is {board.map_size}x{board.map_size}")
+        board.weight_map.update(settings['weight_map'])
+        board.start_location = tuple(settings['start_location'])
+        board.goal_location = tuple(settings['goal_location'])
+        board.set_game_map(np.array(self.arrays['tiles']))
+        board.set_player_location(tuple(settings['player_location']))
+
+    # Build a board from the checkpoint, extra keyword arguments go to Board
+    def make_board(self, **board_kwargs):
+        settings = self.board_settings
+        board = Board(
+            map_size=settings['map_size'],
+            start_location=settings['start_location'],
+            goal_location=settings['goal_location'],
+            **board_kwargs
+        )
+        self.apply_to_board(board)
+        return board
+
+    # Build a learner with the saved preferences, Q-table, and random generator state
+    # A dense Q-table stays memory-mapped, a sparse one is rebuilt from its saved rows
+    # Replay buffers and planning models aren't saved, pass their options through learner_kwargs to start fresh ones
+    def make_learner(self, **learner_kwargs):
+        settings = self.learner_settings
+        learner = Q_Learner(
+            settings['total_states'], settings['total_actions'],
+            inp_learning_rate_OPT=settings['learning_rate'],
+            inp_rewards_rate_OPT=settings['rewards_rate'],
+            inp_exploration_rate_OPT=settings['exploration_rate'],
+            inp_exploration_rate_decay_OPT=settings['exploration_rate_decay'],
+            inp_sparse_OPT=settings['sparse'],
+            **learner_kwargs
+        )
+
+        if settings['sparse']:
+            for state, row in zip(self.arrays['q_states'].tolist(), self.arrays['q_rows']):
+                learner.Q_table[state] = row
+        else:
+            learner.Q_table = self.arrays['q_table']
+        learner.rng.bit_generator.state = settings['rng_state']
+        return learner
@@ -0,0 +1,249 @@
+import os
+import struct
+import numpy as np
+
+# Episode traces: every training step as (episode, step, state, action, reward), appended to a binary log.
+#
+# The log starts with a header (magic, version, map size) and the maze's tile codes, then fixed-size records.
+# Records are written a chunk at a time, and every finished episode adds a row to a small index file next to the log
+# (path + '.index') saying where its records start, so a reader can jump straight to any episode.
+# Both files are only ever appended to, and the reader memory-maps the records instead of loading them.
+
+TRACE_MAGIC = b'QLTR'
+TRACE_VERSION = 1
+HEADER = struct.Struct('<4sII')
+
+RECORD_DTYPE = np.dtype([('episode', '<u4'), ('step', '<u4'), ('state', '<u4'), ('action', 'u1'), ('reward', '<i4')])
+INDEX_DTYPE = np.dtype([('episode', '<u4'), ('start', '<u8'), ('length', '<u4')])
+
+def index_path(path):
+    return f"{path}.index"
+
+# Read the header and maze of a trace file, returns (tiles, offset of the first record)
+def read_header(path):
+    with open(path, 'rb') as trace_file:
+        magic, version, map_size = HEADER.unpack(trace_file.read(HEADER.size))
+        if magic != TRACE_MAGIC:
+            raise ValueError(f"{path} is not an episode trace")
+        if version != TRACE_VERSION:
+            raise ValueError(f"{path} is trace version {version}, only version {TRACE_VERSION} can be read")
+        tiles = np.frombuffer(trace_file.read(map_size * map_size), dtype=np.uint8).reshape(map_size, map_size).copy()
+    return tiles, HEADER.size + map_size * map_size
+
+class TraceRecorder:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Streams training steps into a trace file. Steps are kept in a list and written every chunk_steps steps,
+    # so recording costs one list append per step. Opening an existing trace of the same maze appends to it.
+
+    def __init__(
+        self,
+        path, # trace file to write, the episode index goes next to it
+        board, # Board being trained on, its maze is saved in the header
+        chunk_steps=65536 # steps buffered before they're written out
+    ):
+        self.path = path
+        self.chunk_steps = chunk_steps
+
+        if os.path.exists(path):
+            tiles, self.data_start = read_header(path)
+            if not np.array_equal(tiles, board.tiles):
+                raise ValueError(f"{path} holds a trace of a different maze")
+            self.num_records = (os.path.getsize(path) - self.data_start) // RECORD_DTYPE.itemsize
+        else:
+            with open(path, 'wb') as trace_file:
+                trace_file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, board.map_size))
+                trace_file.write(board.tiles.astype(np.uint8).tobytes())
+            self.data_start = HEADER.size + board.tiles.size
+            self.num_records = 0
+
+        self.trace_file = open(path, 'ab')
+        self.index_file = open(index_path(path), 'ab')
+
+        self.pending = [] # steps not written yet
+        self.pending_index = [] # finished episodes not written yet
+        self.episode_start = self.num_records # record number where the current episode started
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    ###### ~~~~~~~~~~~~~~~~~~~ ######
+    ###### Recording Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~ ######
+
+    # Record one step: the state the player was in, the action it took, and the reward it got
+    def record(self, episode, step, state, action, reward):
+        self.pending.append((episode, step, state, action, reward))
+        self.num_records += 1
+        if len(self.pending) >= self.chunk_steps:
+            self.flush()
+
+    # Mark the end of an episode, adding it to the index
+    def end_episode(self, episode):
+        self.pending_index.append((episode, self.episode_start, self.num_records - self.episode_start))
+        self.episode_start = self.num_records
+
+    # Write out everything buffered so far
+    def flush(self):
+        if self.pending:
+            self.trace_file.write(np.array(self.pending, dtype=RECORD_DTYPE).tobytes())
+            self.pending.clear()
+            self.trace_file.flush()
+        if self.pending_index:
+            self.index_file.write(np.array(self.pending_index, dtype=INDEX_DTYPE).tobytes())
+            self.pending_index.clear()
+            self.index_file.flush()
+
+    def close(self):
+        if self.trace_file.closed:
+            return
+        self.flush()
+        self.trace_file.close()
+        self.index_file.close()
+
+class TraceReader:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Read-only view of a trace. The records are memory-mapped and the index is small, so opening is instant
+    # and getting an episode is just a slice. Steps recorded after the last indexed episode (an episode that was
+    # still running when recording stopped) show up as one more episode at the end.
+
+    def __init__(
+        self,
+        path # trace file written by TraceRecorder
+    ):
+        self.path = path
+        self.tiles, data_start = read_header(path)
+        num_records = (os.path.getsize(path) - data_start) // RECORD_DTYPE.itemsize
+        if num_records:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=data_start, shape=(num_records,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+        if os.path.exists(index_path(path)):
+            index = np.fromfile(index_path(path), dtype=INDEX_DTYPE)
+        else:
+            index = np.zeros(0, dtype=INDEX_DTYPE)
+        indexed_end = int(index['start'][-1] + index['length'][-1]) if len(index) else 0
+        if num_records > indexed_end:
+            tail = np.array([(self.records[indexed_end]['episode'], indexed_end, num_records - indexed_end)], dtype=INDEX_DTYPE)
+            index = np.concatenate([index, tail])
+        self.index = index
+        return
+
+    def __len__(self):
+        return len(self.index)
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    @property
+    def map_size(self):
+        return self.tiles.shape[0]
+
+    # Episode number of every episode in the trace, in the order they were recorded
+    def episode_numbers(self):
+        return self.index['episode']
+
+    # Position in the index of an episode number (the latest one, if an episode number was recorded twice)
+    def find_episode(self, episode):
+        positions = np.flatnonzero(self.index['episode'] == episode)
+        if positions.size == 0:
+            raise KeyError(f"episode {episode} isn't in the trace")
+        return int(positions[-1])
+
+    # Records of the episode at a position in the index, as a structured array with RECORD_DTYPE fields
+    def get_episode(self, position):
+        entry = self.index[position]
+        start = int(entry['start'])
+        return self.records[start:start + int(entry['length'])]
+
+class TracePlayer:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Plays a trace back on a board without the learner: each step moves the player to where the recorded action took it,
+    # looked up in the board's transition table. Moves on to the next episode at the end of each one.
+
+    def __init__(
+        self,
+        reader, # TraceReader to play
+        board # Board to move the player on, should hold the trace's maze
+    ):
+        self.reader = reader
+        self.board = board
+        self.position = 0 # which episode in the index is playing
+        self.records = None
+        self.step_index = 0 # next record to show
+        self.reward = None
+        self.direction = None
+        self.seek(0)
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Episode number being played
+    def get_episode(self):
+        if len(self.reader) == 0:
+            return 0
+        return int(self.reader.index[self.position]['episode'])
+
+    # Steps shown so far in the current episode
+    def get_step(self):
+        return self.step_index
+
+    # Start playing the episode at a position in the index (wraps around)
+    def seek(self, position):
+        if len(self.reader) == 0:
+            self.records = self.reader.records
+            return
+        self.position = position % len(self.reader)
+        self.records = self.reader.get_episode(self.position)
+        self.step_index = 0
+        self.reward = None
+        self.direction = None
+        if len(self.records):
+            self.board.set_player_location(self.board.state_to_location(int(self.records[0]['state'])))
+
+    # Start playing an episode by its number
+    def seek_episode(self, episode):
+        self.seek(self.reader.find_episode(episode))
+
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+    ###### Playback Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+
+    # Show the next num_steps steps, same signature as Trainer.run_steps so the scheduler can drive it
+    def run_steps(self, num_steps):
+        for _ in range(num_steps):
+            if len(self.reader) == 0:
+                return
+            if self.step_index >= len(self.records):
+                self.seek(self.position + 1)
+                continue
+
+            record = self.records[self.step_index]
+            state = int(record['state'])
+            action = int(record['action'])
+            self.reward = int(record['reward'])
+            self.direction = (action + 2) % 4
+            if self.board.transition_done[state, action]: # Show the step onto the goal rather than the jump back to the start
+                self.board.set_player_location(self.board.goal_location)
+            else:
+                self.board.set_player_location(self.board.state_to_location(self.board.next_states.item(state, action)))
+            self.step_index += 1
@@ -0,0 +1,147 @@
+import numpy as np
+import pygame
+from board import TILE_CODES
+from qtable import SparseQTable
+
+# Colors of the heatmap: most negative value -> zero -> most positive value
+HEATMAP_LOW = (200, 40, 40)
+HEATMAP_ZERO = (30, 30, 30)
+HEATMAP_HIGH = (40, 200, 60)
+ARROW_COLOR = (255, 255, 255)
+
+# Tiles smaller than this don't get arrows, there's no room to draw one
+MIN_ARROW_TILE_SIZE = 8
+
+# Palette of the 8-bit heatmap surface: HEAT_COLORS entries running from HEATMAP_LOW through HEATMAP_ZERO to HEATMAP_HIGH,
+# then the wall, goal, and arrow colors. Arrows get the highest index so they can be laid over the tiles with np.maximum.
+HEAT_COLORS = 250
+WALL_INDEX = 250
+GOAL_INDEX = 251
+ARROW_INDEX = 252
+
+def build_palette(wall_color, goal_color):
+    position = np.linspace(-1.0, 1.0, HEAT_COLORS)[:, None]
+    low = np.array(HEATMAP_LOW, dtype=float)
+    zero = np.array(HEATMAP_ZERO, dtype=float)
+    high = np.array(HEATMAP_HIGH, dtype=float)
+    heat = np.where(position < 0, zero + (low - zero) * -position, zero + (high - zero) * position)
+    palette = [tuple(int(channel) for channel in color) for color in heat.round()]
+    palette += [tuple(wall_color), tuple(goal_color), ARROW_COLOR]
+    return palette + [(0, 0, 0)] * (256 - len(palette))
+
+# Boolean masks of an arrow inside a tile, one per action (0 = right, 1 = up, 2 = left, 3 = down)
+def build_arrow_masks(tile_size):
+    center = (tile_size - 1) / 2
+    y, x = np.mgrid[0:tile_size, 0:tile_size] - center
+    shaft = (np.abs(y) <= max(0.5, tile_size * 0.06)) & (x >= -tile_size * 0.3) & (x <= tile_size * 0.1)
+    head = (x >= 0) & (x <= tile_size * 0.3) & (np.abs(y) <= (tile_size * 0.3 - x) * 0.9)
+    right = shaft | head
+    return np.stack([np.rot90(right, k) for k in range(4)])
+
+# Arrow patches as palette indices, indexed by action + 1 (0 is a blank patch for tiles without an arrow)
+def build_arrow_patches(tile_size):
+    masks = build_arrow_masks(tile_size)
+    patches = np.zeros((len(masks) + 1, tile_size, tile_size), dtype=np.uint8)
+    patches[1:][masks] = ARROW_INDEX
+    return patches
+
+# Highest value, first action with that value, and whether any value is non-zero, for each row of a (states, actions) array
+# Works a column at a time, since reductions along a 4-wide axis are much slower in NumPy than whole-column operations
+def summarize_rows(rows):
+    values = rows[:, 0].copy()
+    actions = np.zeros(len(rows), dtype=np.int64)
+    visited = values != 0
+    for action in range(1, rows.shape[1]):
+        column = rows[:, action]
+        better = column > values
+        values[better] = column[better]
+        actions[better] = action
+        visited |= column != 0
+    return values, actions, visited
+
+# Highest Q-value and greedy action for every state, plus which states have been learned about at all
+def summarize_q_table(Q_table, total_states):
+    if isinstance(Q_table, SparseQTable):
+        values = np.zeros(total_states, dtype=float)
+        actions = np.zeros(total_states, dtype=np.int64)
+        visited = np.zeros(total_states, dtype=bool)
+        states = np.array(Q_table.visited_states(), dtype=np.int64)
+        if states.size:
+            values[states], actions[states], visited[states] = summarize_rows(Q_table.get_rows(states))
+        return values, actions, visited
+    return summarize_rows(np.asarray(Q_table))
+
+class QHeatmap:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Draws a whole Q-table over a board: each floor tile is colored by its best Q-value, with an arrow for its greedy action.
+    # The image is built in NumPy as one array of palette indices for an 8-bit surface (a third of the work of RGB),
+    # copied in with surfarray and put on the screen with a single blit, so it can be redrawn every frame on large maps.
+    # Maps too big for the renderer's board at one pixel per tile are shrunk to fit as they're blitted.
+
+    def __init__(
+        self,
+        renderer # BoardRenderer of the board the Q-table belongs to, the heatmap takes its place, size, and colors
+    ):
+        self.renderer = renderer
+        self.board = renderer.board
+        self.map_size = self.board.map_size
+        self.tile_size = renderer.tile_size
+        self.pixel_size = self.map_size * self.tile_size
+
+        self.surface = pygame.Surface((self.pixel_size, self.pixel_size), depth=8)
+        self.surface.set_palette(build_palette(renderer.colors['wall'], renderer.colors['goal']))
+        self.arrow_patches = build_arrow_patches(self.tile_size) if self.tile_size >= MIN_ARROW_TILE_SIZE else None
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~ ######
+    ###### Drawing Functions ######
+    ###### ~~~~~~~~~~~~~~~~~ ######
+
+    # Build the (height, width) array of palette indices for a Q-table
+    def build_pixels(self, Q_table):
+        values, actions, visited = summarize_q_table(Q_table, self.board.total_states)
+        flat_tiles = self.board.tiles.ravel()
+        floor = flat_tiles == TILE_CODES['floor']
+
+        # Scale positive and negative values separately so both halves of the heat colors get used
+        floor_values = values[floor]
+        high = floor_values.max() if floor_values.size else 0.0
+        low = floor_values.min() if floor_values.size else 0.0
+        scaled = np.zeros(self.board.total_states, dtype=float)
+        if high > 0:
+            positive = values > 0
+            scaled[positive] = values[positive] / high
+        if low < 0:
+            negative = values < 0
+            scaled[negative] = -values[negative] / low
+        tile_indices = np.clip(np.round((scaled + 1.0) * ((HEAT_COLORS - 1) / 2)), 0, HEAT_COLORS - 1).astype(np.uint8)
+        tile_indices[~floor] = WALL_INDEX
+        tile_indices[flat_tiles == TILE_CODES['goal']] = GOAL_INDEX
+
+        # One index per tile, blown up to tile_size x tile_size pixels
+        tile_indices = tile_indices.reshape(self.map_size, self.map_size)
+        pixels = np.repeat(np.repeat(tile_indices, self.tile_size, axis=0), self.tile_size, axis=1)
+
+        # Lay the greedy arrows over the floor tiles the learner knows something about
+        if self.arrow_patches is not None:
+            patch_numbers = np.where(floor & visited, actions + 1, 0)
+            arrows = self.arrow_patches[patch_numbers].reshape(self.map_size, self.map_size, self.tile_size, self.tile_size)
+            np.maximum(pixels, arrows.transpose(0, 2, 1, 3).reshape(self.pixel_size, self.pixel_size), out=pixels)
+        return pixels
+
+    # Draw the heatmap and the player onto the canvas, returns the rectangle covered
+    def draw(self, canvas, Q_table):
+        pixels = self.build_pixels(Q_table)
+        pygame.surfarray.blit_array(self.surface, pixels.T) # surfarray indexes (x, y)
+        surface = self.surface
+        if self.renderer.pixel_size != self.pixel_size:
+            surface = pygame.transform.scale(surface, (self.renderer.pixel_size, self.renderer.pixel_size))
+        rect = canvas.blit(surface, (self.renderer.offset_x, self.renderer.offset_y))
+
+        player_rect = self.renderer.tile_rect(*self.board.get_player_location())
+        pygame.draw.rect(canvas, self.renderer.colors['player'], player_rect, width=max(1, self.tile_size // 8))
+        return rect
@@ -1,6 +1,7 @@
-import random
 import numpy as np
-import time
+from qtable import SparseQTable
+from replay import ReplayBuffer
+from planning import Planner
 
 class Q_Learner:
 
@@ -19,6 +20,9 @@ class Q_Learner:
     exploration_rate = 0.5
     exploration_rate_decay = 0.99
 
+    # Random numbers are drawn this many at a time and handed out one per action
+    random_block_size = 4096
+
     # These are training values used to hold the previous state and action
     train_state = None
     train_action = None
@@ -30,7 +34,13 @@ class Q_Learner:
         inp_learning_rate_OPT=None, # see update_learner_preferences()
         inp_rewards_rate_OPT=None, # see update_learner_preferences()
         inp_exploration_rate_OPT=None, # see update_learner_preferences()
-        inp_exploration_rate_decay_OPT=None # see update_learner_preferences()
+        inp_exploration_rate_decay_OPT=None, # see update_learner_preferences()
+        inp_sparse_OPT=False, # If True, only allocate Q-table rows for states the learner has updated (see qtable.py)
+        inp_track_state_changes_OPT=False, # If True, count how many times each state's Q-values change (see get_convergence_stats())
+        inp_seed_OPT=None, # Seed for the learner's random actions, the same seed gives the same run every time
+        inp_replay_capacity_OPT=None, # If passed, keep this many past transitions so replay() can learn from them again
+        inp_planning_steps_OPT=None, # If passed, make this many simulated updates from a learned model after every train step (Dyna-Q)
+        inp_prioritized_planning_OPT=False # If True, simulated updates go to the transitions with the largest TD-error first (prioritized sweeping)
     ):
         
         # Set required variables for states and actions
@@ -38,13 +48,33 @@ class Q_Learner:
         self.total_actions = inp_total_actions
 
         # Create the initial Q-table, start with all zeros
-        self.Q_table = np.zeros((self.total_states, self.total_actions), dtype=float)
+        if inp_sparse_OPT:
+            self.Q_table = SparseQTable(self.total_states, self.total_actions)
+        else:
+            self.Q_table = np.zeros((self.total_states, self.total_actions), dtype=float)
+
+        # Convergence is tracked as updates happen, so it never needs a copy of the Q-table
+        self.state_change_counts = None
+        if inp_track_state_changes_OPT:
+            self.state_change_counts = {} if inp_sparse_OPT else np.zeros(self.total_states, dtype=np.int64)
+        self.reset_convergence()
+
+        # Every transition seen in train_step() is saved here when replay is on
+        self.replay_buffer = None
+        if inp_replay_capacity_OPT is not None:
+            self.replay_buffer = ReplayBuffer(inp_replay_capacity_OPT)
+
+        # Model of the environment used for planning, see planning.py
+        self.planner = None
+        if inp_planning_steps_OPT is not None:
+            self.planner = Planner(inp_planning_steps_OPT, prioritized=inp_prioritized_planning_OPT)
 
         # Update optional varaibles for learning, reward, and random action rates
         self.set_learner_preferences(inp_learning_rate_OPT, inp_rewards_rate_OPT, inp_exploration_rate_OPT, inp_exploration_rate_decay_OPT)
         
-        # Set random seed based on current time
-        random.seed(time.time() * 1000)
+        # The learner has its own random generator so runs can be repeated, and doesn't touch the global random module
+        self.rng = np.random.default_rng(inp_seed_OPT)
+        self.random_index = self.random_block_size
 
         return
 
@@ -81,14 +111,38 @@ class Q_Learner:
                 results.append(getattr(self, '_'.join(arg_name.split('_')[1:-1])))
         return results
     
-    # Helper method to calculate convergence between the current Q-table and an old copy passed to the function
-    # Note: the Q-learner does not store its own copies to compare, but you can grab on with get_q_table()
+    # Helper method to calculate convergence of the Q-table
+    # With no arguments this is O(1): the mean squared change per Q-table entry, accumulated from every update since reset_convergence()
+    # Passing an old copy from get_q_table() gives the exact MSE between the two tables instead
     def get_convergence(
         self,
-        inp_old_q_table
+        inp_old_q_table=None
     ):
+        if inp_old_q_table is None:
+            return self.convergence_sum / (self.total_states * self.total_actions)
+        if isinstance(self.Q_table, SparseQTable):
+            return self.Q_table.mean_squared_difference(inp_old_q_table)
         return np.mean((self.Q_table - inp_old_q_table) ** 2)
 
+    # Start a new convergence window, e.g. at the end of each episode
+    def reset_convergence(self):
+        self.convergence_sum = 0.0
+        self.convergence_max = 0.0
+        self.convergence_updates = 0
+        if isinstance(self.state_change_counts, dict):
+            self.state_change_counts.clear()
+        elif self.state_change_counts is not None:
+            self.state_change_counts[:] = 0
+
+    # Everything tracked about the current convergence window
+    def get_convergence_stats(self):
+        return {
+            'mse': self.get_convergence(),
+            'max_delta': self.convergence_max,
+            'updates': self.convergence_updates,
+            'state_change_counts': self.state_change_counts
+        }
+
     # Accessor function to get the current Q table values
     def get_q_table(
         self,
@@ -100,7 +154,7 @@ class Q_Learner:
         elif(inp_action_OPT is None):
             return self.Q_table[inp_state_OPT]
         else:
-            return self.Q_table[inp_state_OPT][inp_action_OPT]
+            return self.Q_table[inp_state_OPT, inp_action_OPT]
     
     # toString method to print relevant data quickly
     def __str__(self):
@@ -117,6 +171,12 @@ class Q_Learner:
     ###### Machine Learning Functions ######
     ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
 
+    # Draw the next block of random numbers, one uniform and one random action per call to calculate_action()
+    def draw_random_block(self):
+        self.random_uniforms = self.rng.random(self.random_block_size).tolist()
+        self.random_actions = self.rng.integers(0, self.total_actions, size=self.random_block_size).tolist()
+        self.random_index = 0
+
     # Function to calculate the best action to take given the current state
     def calculate_action(
         self,
@@ -124,12 +184,17 @@ class Q_Learner:
         training
     ):
         # Determine if a random action will be taken
-        rng = random.random()
+        if self.random_index >= self.random_block_size:
+            self.draw_random_block()
+        rng = self.random_uniforms[self.random_index]
+        random_action = self.random_actions[self.random_index]
+        self.random_index += 1
+
         if training:
             self.exploration_rate *= self.exploration_rate_decay
 
         if rng < self.exploration_rate and training:
-            action = random.randint(0, self.total_actions - 1)
+            action = random_action
         else:
             # If not a random action, pick the best action based on the Q-Table for the current state
             action = np.argmax(self.Q_table[inp_new_state])
@@ -141,20 +206,111 @@ class Q_Learner:
 
         return action
        
+    # Apply one Bellman update for a (state, action, reward, next state) transition, returns how much the Q-value changed
+    def update_q_value(
+        self,
+        inp_state, # The state the action was taken in
+        inp_action, # The action taken
+        inp_reward, # The reward for taking it
+        inp_new_state, # The state it led to
+        inp_done_OPT=False # If True the new state is terminal (the goal), so there are no future rewards to look ahead to
+    ):
+        current_Q_value = self.Q_table[inp_state, inp_action]
+        if inp_done_OPT:
+            future_rewards = inp_reward
+        else:
+            future_rewards = inp_reward + self.rewards_rate * self.Q_table[inp_new_state].max()
+        new_Q_value = (1.0 - self.learning_rate) * current_Q_value + self.learning_rate * future_rewards
+        self.Q_table[inp_state, inp_action] = new_Q_value
+
+        # Track convergence from the size of this update
+        delta = abs(float(new_Q_value - current_Q_value))
+        self.convergence_sum += delta * delta
+        self.convergence_updates += 1
+        if delta > self.convergence_max:
+            self.convergence_max = delta
+        if self.state_change_counts is not None and delta > 0.0:
+            if isinstance(self.state_change_counts, dict):
+                self.state_change_counts[inp_state] = self.state_change_counts.get(inp_state, 0) + 1
+            else:
+                self.state_change_counts[inp_state] += 1
+        return delta
+
     # Method to update the Q-table with an experience tuple, requires a new state and reward for that state, and adds those to previously saved state and action to get to those
+    # Returns the next action to take, or None if the episode just ended (call start_episode() for the next one)
     def train_step(
         self,
         inp_new_state, # The new state entered
-        inp_reward # The reward for entering that state
+        inp_reward, # The reward for entering that state
+        inp_done_OPT=False # If True the new state ended the episode (the goal), it isn't bootstrapped from
     ):
         # Update Q-table with experience tuple
-        current_Q_value = self.Q_table[self.train_state][self.train_action]
-        future_rewards = inp_reward + self.rewards_rate * (self.Q_table[inp_new_state, np.argmax(self.Q_table[inp_new_state])])
-        self.Q_table[self.train_state][self.train_action] = (1.0 - self.learning_rate) * current_Q_value + self.learning_rate * future_rewards
+        self.update_q_value(self.train_state, self.train_action, inp_reward, inp_new_state, inp_done_OPT)
 
+        if self.replay_buffer is not None:
+            self.replay_buffer.add(self.train_state, self.train_action, inp_reward, inp_new_state, inp_done_OPT)
+
+        # Learn from simulated experience too, using what the planner remembers about the environment
+        if self.planner is not None:
+            self.planner.observe(self, self.train_state, self.train_action, inp_reward, inp_new_state, inp_done_OPT)
+            self.planner.plan(self)
+
+        if inp_done_OPT:
+            return None
         action = self.calculate_action(inp_new_state=inp_new_state, training=True)
         return action
 
+    # Pick the first action of a training episode, call this with the start state before the first train_step()
+    def start_episode(
+        self,
+        inp_state # The state the episode starts in
+    ):
+        return self.calculate_action(inp_new_state=inp_state, training=True)
+
+    # Re-learn from a batch of saved transitions at once, call this as often as you like between train steps
+    # Returns the number of Q-table entries updated
+    def replay(
+        self,
+        inp_batch_size # How many transitions to sample from the replay buffer
+    ):
+        if self.replay_buffer is None or len(self.replay_buffer) == 0:
+            return 0
+        states, actions, rewards, next_states, dones = self.replay_buffer.sample(inp_batch_size, self.rng)
+
+        # Bellman targets for the whole batch, terminal transitions don't look ahead
+        sparse = isinstance(self.Q_table, SparseQTable)
+        if sparse:
+            future_Q = self.Q_table.get_rows(next_states).max(axis=1)
+            current_Q = self.Q_table.get_rows(states)[np.arange(inp_batch_size), actions]
+        else:
+            future_Q = self.Q_table[next_states].max(axis=1)
+            current_Q = self.Q_table[states, actions]
+        targets = rewards + self.rewards_rate * np.where(dones, 0.0, future_Q)
+        deltas = self.learning_rate * (targets - current_Q)
+
+        # The same (state, action) can be sampled more than once, average its updates instead of letting them pile up
+        entries, inverse, counts = np.unique(states * self.total_actions + actions, return_inverse=True, return_counts=True)
+        deltas = np.bincount(inverse, weights=deltas) / counts
+        entry_states, entry_actions = np.divmod(entries, self.total_actions)
+        if sparse:
+            self.Q_table.add_values(entry_states, entry_actions, deltas)
+        else:
+            self.Q_table[entry_states, entry_actions] += deltas
+
+        # Track convergence from the size of these updates
+        self.convergence_sum += float(np.dot(deltas, deltas))
+        self.convergence_updates += len(deltas)
+        self.convergence_max = max(self.convergence_max, float(np.abs(deltas).max()))
+        if self.state_change_counts is not None:
+            changed = entry_states[deltas != 0.0]
+            if isinstance(self.state_change_counts, dict):
+                for state in changed.tolist():
+                    self.state_change_counts[state] = self.state_change_counts.get(state, 0) + 1
+            else:
+                np.add.at(self.state_change_counts, changed, 1)
+
+        return len(deltas)
+
     # Helper method for testing the model, call this each time a new state is entered and the next action is desired
     def test_step(
         self,
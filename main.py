@@ -1,168 +1,280 @@
-import pygame
-import time
-import random
+import os
+import argparse
+import numpy as np
 from board import Board
 from learner import Q_Learner
-
-random.seed(int(time.time() * 1000))
-
-def create_q_learner():
-
-    num_states = 100
-    num_actions = 4
-    learning_rate = 0.2
-    future_rewards_rate = 0.9
-    exploration_rate = 0.5
-    exploration_rate_decay = 0.99
-
-    learner = Q_Learner(inp_total_states=num_states, inp_total_actions=num_actions, inp_learning_rate_OPT=learning_rate, inp_rewards_rate_OPT=future_rewards_rate, inp_exploration_rate_OPT=exploration_rate, inp_exploration_rate_decay_OPT=exploration_rate_decay)
-    return learner
-
-def draw_button(screen, text, x, y, width, height, font, color, text_color):
-    pygame.draw.rect(screen, color, (x, y, width, height))
-    text_surface = font.render(text, True, text_color)
-    text_rect = text_surface.get_rect(center=(x + width // 2, y + height // 2))
-    screen.blit(text_surface, text_rect)
-
-def is_button_clicked(mouse_pos, button_rect):
-    return button_rect.collidepoint(mouse_pos)
-
-pygame.init()
-
-# Define GUI size variables
-
-tile_size = 60
-map_size = 10
-padding = 30
-board_length = tile_size * map_size
-screen_width = board_length * 2 + padding * 3
-screen_height = board_length * 2 + padding * 3
-
-# Create screen
-screen = pygame.display.set_mode((screen_width, screen_height))
-clock = pygame.time.Clock()
-last_tick_time = pygame.time.get_ticks()
-pygame.display.set_caption("Q-Learner")
-
-# Create boards
-b_environment = Board(tile_size=tile_size, map_size=map_size, offset_x=padding, offset_y=padding)
-b_learner = Board(tile_size=tile_size, map_size=map_size, offset_x=(padding * 2 + board_length), offset_y=padding)
-
-font = pygame.font.SysFont("Arial", 35, bold=True)
-env_title = font.render("Environment", True, (245, 245, 245))
-learner_title = font.render("Learner", True, (245, 245, 245))
-
-alpha_text = font.render("Learning rate: 0.2", True, (245, 245, 245))
-screen.blit(alpha_text, (700, 1000))
-
-gamma_text = font.render("Rewards rate: 0.9", True, (245, 245, 245))
-screen.blit(gamma_text, (700, 1050))
-
-explored_text = font.render("Exploration rate decay: 0.99", True, (245, 245, 245))
-screen.blit(explored_text, (700, 1100))
-
-# Set state variables before starting main loop
-
-weights_toggle = False # When false, weights are not displayed
-weights_text = {
-    True: "Weights: ON",
-    False: "Weights: OFF"
-}
-
-train_toggle = False
-train_text = {
-    True: "Stop Training",
-    False: "Start Training"
-}
-
-run_toggle = False
-run_text = {
-    True: "Stop Model",
-    False: "Start Model"
-}
-
-speed_toggle = False
-speed_check = 100
-speed_text = {
-    True: "Set to 1x speed",
-    False: "Set to 2x speed"
-}
-
-# Declare state booleans to control flow
-terrain_set_toggle = False # When false, you can change terrain. When true, you cannot change terrain
-any_terrain_made = False
-first_train_step = True
-first_run_step = True
-
-# Declare Q Leraner variables
-learner = create_q_learner()
-state = None
-action = None
-next_state = None
-reward = None
-state_weight = None
-direction = None
-old_q = learner.get_q_table()
-
-num_episodes = 1
-num_steps = 0
-convergence = 0
-
-while True:
-
-    # Allows the environment to run at double speed wanted
-    if(speed_toggle):
-        speed_check = 50
+from trainer import Trainer
+from scheduler import StepScheduler
+from worker import TrainingWorker
+from maze import MAZE_METHODS, generate_for_board
+from checkpoint import Checkpoint, save_checkpoint
+from episode_trace import TraceRecorder, TraceReader, TracePlayer
+from profiler import FrameProfiler
+from qcache import QTableCache
+
+def parse_location(text):
+    row, col = text.split(',')
+    return (int(row), int(col))
+
+parser = argparse.ArgumentParser(description="Visualize a Q-learner solving a maze")
+parser.add_argument("--map-size", type=int, default=10, help="width and height of the maze in tiles")
+parser.add_argument("--sparse", action="store_true", help="only allocate Q-table rows for visited states (for large maps)")
+parser.add_argument("--seed", type=int, default=None, help="seed for the learner's random actions, for repeatable runs")
+parser.add_argument("--worker", action="store_true", help="train in a background process that shares its Q-table with the window")
+parser.add_argument("--fps", type=int, default=60, help="target frames per second for rendering")
+parser.add_argument("--maze", choices=MAZE_METHODS, default="random", help="how Generate Walls builds the maze")
+parser.add_argument("--wall-rate", type=float, default=0.25, help="share of floor tiles turned into walls by the random maze")
+parser.add_argument("--maze-seed", type=int, default=None, help="seed for the generated mazes, for repeatable runs")
+parser.add_argument("--start", type=parse_location, default=None, help="ROW,COL the player starts from, defaults to 1,1")
+parser.add_argument("--goal", type=parse_location, default=None, help="ROW,COL of the goal, defaults to the bottom wall one tile in from the right")
+parser.add_argument("--resume", default=None, help="checkpoint to load the maze and learner from, to carry on training")
+parser.add_argument("--checkpoint", default=None, help="where to save a checkpoint when pressing S or closing the window, defaults to the --resume file")
+parser.add_argument("--record", default=None, help="record every training step to this trace file, to watch later with --replay")
+parser.add_argument("--replay", default=None, help="play back a trace recorded with --record instead of training")
+parser.add_argument("--qcache", default=None, help="file of trained Q-tables by maze: a maze trained before starts from its table, a new one from the most similar, saved on close")
+parser.add_argument("--profile", action="store_true", help="show frame timings in the window, and press P to save a cProfile capture")
+parser.add_argument("--profile-seconds", type=float, default=5.0, help="how long a capture started with P runs for")
+# Everything below only runs when main.py is started as a script, so importing it (a spawned worker process does) is cheap
+# pygame and the renderers are only imported here, when a window is actually going to be opened
+if __name__ == '__main__':
+    import pygame
+    from text_cache import shared_text_cache
+    from board_renderer import BoardRenderer
+    from heatmap import QHeatmap
+
+    args = parser.parse_args()
+    if args.replay is not None and (args.resume is not None or args.record is not None):
+        parser.error("--replay can't be combined with --resume or --record")
+
+    # Replays take the maze from the trace, the steps are memory-mapped and only read as they're played
+    replay_reader = TraceReader(args.replay) if args.replay is not None else None
+
+    # Resuming takes the map size from the checkpoint, the arrays are memory-mapped so even large ones open right away
+    resume_checkpoint = Checkpoint(args.resume) if args.resume is not None else None
+    checkpoint_path = args.checkpoint if args.checkpoint is not None else args.resume
+
+    # The worker shares a dense Q-table with the window, a sparse one can't be put in shared memory
+    if args.worker and (args.sparse or (resume_checkpoint is not None and resume_checkpoint.learner_settings['sparse'])):
+        parser.error("--worker needs a dense Q-table, it can't be combined with --sparse or a sparse --resume checkpoint")
+
+    # Trained Q-tables from earlier runs keyed by maze, so training on a maze that comes back doesn't start from zero
+    qcache = None
+    if args.qcache is not None:
+        qcache = QTableCache()
+        if os.path.exists(args.qcache):
+            qcache.load_file(args.qcache)
+
+    def create_q_learner(num_states, sparse=False, seed=None):
+
+        num_actions = 4
+        learning_rate = 0.2
+        future_rewards_rate = 0.9
+        exploration_rate = 0.5
+        exploration_rate_decay = 0.99
+
+        learner = Q_Learner(inp_total_states=num_states, inp_total_actions=num_actions, inp_learning_rate_OPT=learning_rate, inp_rewards_rate_OPT=future_rewards_rate, inp_exploration_rate_OPT=exploration_rate, inp_exploration_rate_decay_OPT=exploration_rate_decay, inp_sparse_OPT=sparse, inp_seed_OPT=seed)
+        return learner
+
+    def draw_button(screen, text, x, y, width, height, font, color, text_color):
+        pygame.draw.rect(screen, color, (x, y, width, height))
+        text_surface = shared_text_cache.render(font, text, text_color)
+        text_rect = text_surface.get_rect(center=(x + width // 2, y + height // 2))
+        screen.blit(text_surface, text_rect)
+
+    # Status text drawn last frame, keyed by position, so unchanged lines aren't rendered again
+    status_lines = {}
+
+    # Draw a line of status text if it changed since last time, returns the rectangle to update or None if nothing changed
+    # These values rarely repeat, so they're rendered directly rather than pushing the tile weights out of the text cache
+    def draw_status_line(screen, text, x, y, font):
+        old = status_lines.get((x, y))
+        if old is not None and old[0] == text:
+            return None
+
+        text_surface = font.render(text, True, (245, 245, 245))
+        rect = pygame.Rect(x, y, text_surface.get_width() + 50, text_surface.get_height())
+        if old is not None:
+            rect.width = max(rect.width, old[1])
+        pygame.draw.rect(screen, (0, 0, 0), rect)
+        screen.blit(text_surface, (x, y))
+        status_lines[(x, y)] = (text, rect.width)
+        return rect
+
+    def is_button_clicked(mouse_pos, button_rect):
+        return button_rect.collidepoint(mouse_pos)
+
+    pygame.init()
+
+    # Define GUI size variables
+
+    map_size = args.map_size
+    if resume_checkpoint is not None:
+        map_size = resume_checkpoint.board_settings['map_size']
+    elif replay_reader is not None:
+        map_size = replay_reader.map_size
+    padding = 30
+    board_length = 600
+    tile_size = max(1, board_length // map_size)
+    screen_width = board_length * 2 + padding * 3
+    screen_height = board_length * 2 + padding * 3
+
+    # Create screen
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    clock = pygame.time.Clock()
+    pygame.display.set_caption("Q-Learner")
+
+    # Create boards
+    b_environment = Board(map_size=map_size, start_location=args.start, goal_location=args.goal)
+    b_learner = Board(map_size=map_size, start_location=args.start, goal_location=args.goal)
+    # Maps with more tiles than board_length pixels across are shrunk to fit
+    r_environment = BoardRenderer(b_environment, tile_size=tile_size, offset_x=padding, offset_y=padding, max_pixels=board_length)
+    r_learner = BoardRenderer(b_learner, tile_size=tile_size, offset_x=(padding * 2 + board_length), offset_y=padding, max_pixels=board_length)
+    maze_rng = np.random.default_rng(args.maze_seed)
+    if resume_checkpoint is not None:
+        resume_checkpoint.apply_to_board(b_environment)
+        resume_checkpoint.apply_to_board(b_learner)
+    if replay_reader is not None:
+        b_environment.set_game_map(replay_reader.tiles)
+        b_learner.set_game_map(replay_reader.tiles)
+
+    font = pygame.font.SysFont("Arial", 35, bold=True)
+    profile_font = pygame.font.SysFont("Arial", 24, bold=True)
+    env_title = font.render("Environment", True, (245, 245, 245))
+    learner_title = font.render("Learner", True, (245, 245, 245))
+
+    alpha_text = font.render("Learning rate: 0.2", True, (245, 245, 245))
+    screen.blit(alpha_text, (700, 1000))
+
+    gamma_text = font.render("Rewards rate: 0.9", True, (245, 245, 245))
+    screen.blit(gamma_text, (700, 1050))
+
+    explored_text = font.render("Exploration rate decay: 0.99", True, (245, 245, 245))
+    screen.blit(explored_text, (700, 1100))
+
+    # Set state variables before starting main loop
+
+    weights_toggle = False # When false, weights are not displayed
+    weights_text = {
+        True: "Weights: ON",
+        False: "Weights: OFF"
+    }
+
+    heatmap_toggle = False # When true, the learner map shows the whole Q-table as a heatmap with greedy arrows
+    heatmap_text = {
+        True: "Heatmap: ON",
+        False: "Heatmap: OFF"
+    }
+
+    train_toggle = False
+    train_text = {
+        True: "Stop Training",
+        False: "Start Training"
+    }
+
+    run_toggle = False
+    run_text = {
+        True: "Stop Model",
+        False: "Start Model"
+    }
+
+    # Controls how many simulation steps run per frame, the speed button cycles through its speeds
+    scheduler = StepScheduler(target_fps=args.fps)
+
+    # Declare state booleans to control flow
+    terrain_set_toggle = resume_checkpoint is not None or replay_reader is not None # When false, you can change terrain. When true, you cannot change terrain
+    any_terrain_made = terrain_set_toggle
+    first_run_step = True
+    qcache_loaded = terrain_set_toggle # resumed and replayed learners keep their own tables
+
+    # Declare Q Leraner variables
+    if resume_checkpoint is None:
+        learner = create_q_learner(map_size * map_size, sparse=args.sparse, seed=args.seed)
     else:
-        speed_check = 100
-
-    current_time = pygame.time.get_ticks()
-    if(current_time - last_tick_time) >= speed_check:
-        last_tick_time = current_time
-
-        if(train_toggle):
-            # Taking actions to train the Q-learner
-
-            # discretize the current state
-            player_pos = list(b_environment.get_player_location())
-            state = player_pos[0] * 10 + player_pos[1]
-
-            if first_train_step: # First step, we don't have anything yet. Set our initial state and get an action back
-                action = learner.test_step(state)
-                first_train_step = False
-                num_episodes = 1
-                num_steps = 1
-            else: # All other circumstances, we have an action, and the learner has a prior state. Now, take that action, and pass the new state and reward from that state to the learner
-                # it will return a new action to take based on that.
-                reward = b_environment.move_player(direction=action)
-                b_learner.move_player(direction=action)
-                state_weight = learner.get_q_table(inp_state_OPT=state, inp_action_OPT=action)
-                direction = ((action + 2) % 4 )
-                
-                new_player_pos = b_environment.get_player_location()
-                new_state = new_player_pos[0] * 10 + new_player_pos[1]
-                
-                # Takes a train step
-                action = learner.train_step(inp_new_state=new_state, inp_reward=reward)
-                
-                num_steps += 1
-                if(reward == 100): # We won the round
-                    convergence = learner.get_convergence(inp_old_q_table=old_q)
-                    old_q = learner.get_q_table()
-                    num_episodes += 1
-                    num_steps = 0
-
-        elif(run_toggle):
-
-            # Reset our homie for the big show
-            if first_run_step:
-                first_run_step = False
-                b_environment.set_player_location((1,1))
-                b_learner.set_player_location((1,1))
-
+        learner = resume_checkpoint.make_learner()
+    state = None
+    action = None
+    next_state = None
+    reward = None
+    state_weight = None
+    direction = None
+    trainer = Trainer(b_environment, learner)
+    worker = None # Background training process, only created with --worker once training starts
+    recorder = None # Trace of the training steps, only created with --record once training starts
+
+    # With --replay, Start Model plays the recorded episodes back instead of running the learner
+    replay_player = None
+    replay_seek_text = "" # episode number typed in so far, Enter jumps to it
+    if replay_reader is not None:
+        replay_player = TracePlayer(replay_reader, b_environment)
+        b_learner.set_player_location(b_environment.get_player_location())
+        run_text = {
+            True: "Pause Replay",
+            False: "Play Replay"
+        }
+
+    num_episodes = 1
+    num_steps = 0
+    convergence = 0
+    if resume_checkpoint is not None:
+        trainer.set_counters(resume_checkpoint.counters)
+        num_episodes = trainer.get_counters()['episode']
+    if replay_player is not None:
+        num_episodes = replay_player.get_episode()
+
+    # Save the maze, learner, and episode counters so training can be resumed with --resume
+    def save_progress(path):
+        counters = trainer.get_counters()
+        if worker is not None:
+            counters['episode'] = num_episodes
+            counters['step'] = num_steps
+        save_checkpoint(path, b_environment, learner, counters)
+        print(f"Saved checkpoint to {path}")
+
+    # Start the learner from the cache's table for the maze on the board (or the most similar maze's), if there is one
+    def load_cached_q_table():
+        global qcache_loaded
+        status = qcache.load(b_environment, learner)
+        qcache_loaded = True
+        print(f"Q-table cache {status}, {len(qcache)} mazes cached")
+
+    # Add the learner's table to the cache and write it out, only once it has trained on the maze
+    def save_q_cache():
+        if trainer.num_episodes == 0 and worker is None:
+            return
+        qcache.store(b_environment, learner)
+        qcache.save(args.qcache)
+        print(f"Saved Q-table cache to {args.qcache}")
+
+    # Button hit boxes
+    b_wall_add_rect = pygame.Rect(30, (screen_height // 2 + 30), 300, 80)
+    b_double_speed_rect = pygame.Rect(30, (screen_height // 2 + 120), 300, 80)
+    b_train_learner = pygame.Rect(330, (screen_height // 2 + 30), 300, 80)
+    b_start_rect = pygame.Rect(660, (screen_height // 2 + 30), 300, 80)
+    b_weights_rect = pygame.Rect(990, (screen_height // 2 + 30), 270, 80)
+    b_heatmap_rect = pygame.Rect(330, (screen_height // 2 + 120), 300, 80)
+
+    heatmap = QHeatmap(r_learner)
+
+    # Per-phase frame timings, only collected and shown with --profile
+    profiler = FrameProfiler(enabled=args.profile)
+    frame_steps = 0 # simulation steps run this frame
+    last_worker_steps = 0
+
+    full_redraw = True # When true, the whole window is drawn and flipped on the next tick instead of just what changed
+
+    # Run the trained model without updating its Q-table
+    def run_model_steps(num_steps):
+        global first_run_step, state, action, state_weight, direction
+
+        # Reset our homie for the big show
+        if first_run_step:
+            first_run_step = False
+            b_environment.set_player_location(b_environment.start_location)
+            b_learner.set_player_location(b_environment.start_location)
+
+        for _ in range(num_steps):
             # discretize the current state
-            player_pos = list(b_environment.get_player_location())
-            state = player_pos[0] * 10 + player_pos[1]
+            state = b_environment.get_state()
 
             # Get the action, we can take it right away no need to wait for the next rep, we aren't saving anything.
             action = learner.test_step(inp_new_state=state)
@@ -173,88 +285,195 @@ while True:
             state_weight = learner.get_q_table(inp_state_OPT=state, inp_action_OPT=action)
             direction = ((action + 2) % 4 )
 
-        b_environment.draw_map(screen, weights_toggle)
-        b_learner.draw_map(screen, weights_toggle, custom_weight=state_weight, direction=direction) # , custom_weights=state_weights
+    # Play the next steps of the recorded trace and mirror them on the learner's map
+    def run_replay_steps(num_steps):
+        global direction
+        replay_player.run_steps(num_steps)
+        b_learner.set_player_location(b_environment.get_player_location())
+        direction = replay_player.direction
+
+    # Jump to an episode of the trace, by its position in the trace
+    def seek_replay(position):
+        global num_episodes, num_steps
+        replay_player.seek(position)
+        b_learner.set_player_location(b_environment.get_player_location())
+        num_episodes = replay_player.get_episode()
+        num_steps = replay_player.get_step()
+
+    while True:
+
+        # Wait out the rest of the frame, dt is how long the last frame took
+        dt = clock.tick(args.fps)
+        profiler.next_frame(frame_steps)
+        frame_steps = 0
+
+        if(worker is not None and (train_toggle or not run_toggle)):
+            # The worker trains on its own, just show the latest snapshot of what it's doing
+            status = worker.get_status()
+            b_environment.set_player_location(b_environment.state_to_location(int(status['player_state'])))
+            b_learner.set_player_location(b_environment.get_player_location())
+
+            state_weight = None if status['state_weight'] != status['state_weight'] else status['state_weight'] # NaN until the first step
+            direction = int(status['direction'])
+            num_episodes = int(status['episode'])
+            num_steps = int(status['step'])
+            frame_steps = max(0, int(status['total_steps']) - last_worker_steps)
+            last_worker_steps = int(status['total_steps'])
+            convergence = status['convergence']
+            learner.set_learner_preferences(inp_exploration_rate_OPT=status['exploration_rate'])
+
+        elif(train_toggle):
+            # Taking actions to train the Q-learner, the scheduler decides how many steps fit in this frame
+            frame_steps = scheduler.run_frame(trainer.run_steps, dt)
+            b_learner.set_player_location(b_environment.get_player_location())
+
+            state_weight = trainer.state_weight
+            direction = trainer.direction
+            num_episodes = trainer.num_episodes
+            num_steps = trainer.num_steps
+            convergence = trainer.convergence
+
+        elif(run_toggle and replay_player is not None):
+            frame_steps = scheduler.run_frame(run_replay_steps, dt)
+            num_episodes = replay_player.get_episode()
+            num_steps = replay_player.get_step()
 
-        # Add map titles
-        screen.blit(env_title, (padding + board_length // 2 - env_title.get_width() // 2, padding // 2 - env_title.get_height() // 2))
-        screen.blit(learner_title, (padding * 2 + board_length + board_length // 2 - learner_title.get_width() // 2, padding // 2 - env_title.get_height() // 2))
+        elif(run_toggle):
+            frame_steps = scheduler.run_frame(run_model_steps, dt)
 
-        # Line between maps and bottom
-        pygame.draw.line(screen, (245, 245, 245), (padding, board_length + padding * 2), (screen_width - padding, board_length + padding * 2), 2)  
-    
-        # Add walls button
-        b_wall_add_rect = pygame.Rect(30, (screen_height // 2 + 30), 300, 80)
-        if(terrain_set_toggle):
-            draw_button(screen, "Generate Walls", 30, (screen_height // 2 + 30), 270, 80, font, (100, 100, 100), (70, 70, 70))
-        else:
-            draw_button(screen, "Generate Walls", 30, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
+        profiler.lap('simulation')
 
-        b_double_speed_rect = pygame.Rect(30, (screen_height // 2 + 120), 300, 80)
-        draw_button(screen, speed_text[speed_toggle], 30, (screen_height // 2 + 120), 300, 80, font, (70, 70, 70), (245, 245, 245))
+        if(full_redraw):
+            # Something outside the maps changed (or this is the first frame), draw everything and flip the whole window
+            full_redraw = False
+            dirty_rects = None
+            status_lines.clear()
 
-        # Add Train Learner Button
-        b_train_learner = pygame.Rect(330, (screen_height // 2 + 30), 300, 80)
-        if(not any_terrain_made):
-            draw_button(screen, train_text[train_toggle], 330, (screen_height // 2 + 30), 270, 80, font, (100, 100, 100), (70, 70, 70))
-        else:
-            draw_button(screen, train_text[train_toggle], 330, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
+            r_environment.draw_map(screen, weights_toggle)
+            if(heatmap_toggle):
+                heatmap.draw(screen, learner.Q_table)
+            else:
+                r_learner.draw_map(screen, weights_toggle, custom_weight=state_weight, direction=direction) # , custom_weights=state_weights
 
-        # Add start button
-        b_start_rect = pygame.Rect(660, (screen_height // 2 + 30), 300, 80)
-        if(not any_terrain_made):
-            draw_button(screen, run_text[run_toggle], 660, (screen_height // 2 + 30), 270, 80, font, (100, 100, 100), (70, 70, 70))
-        else:
-            draw_button(screen, run_text[run_toggle], 660, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
+            # Add map titles
+            screen.blit(env_title, (padding + board_length // 2 - env_title.get_width() // 2, padding // 2 - env_title.get_height() // 2))
+            screen.blit(learner_title, (padding * 2 + board_length + board_length // 2 - learner_title.get_width() // 2, padding // 2 - env_title.get_height() // 2))
 
-        # Add weights toggle
-        b_weights_rect = pygame.Rect(990, (screen_height // 2 + 30), 270, 80)
-        draw_button(screen, weights_text[weights_toggle], 990, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
+            # Line between maps and bottom
+            pygame.draw.line(screen, (245, 245, 245), (padding, board_length + padding * 2), (screen_width - padding, board_length + padding * 2), 2)  
+    
+            # Add walls button
+            if(terrain_set_toggle):
+                draw_button(screen, "Generate Walls", 30, (screen_height // 2 + 30), 270, 80, font, (100, 100, 100), (70, 70, 70))
+            else:
+                draw_button(screen, "Generate Walls", 30, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
+
+            draw_button(screen, f"Speed: {scheduler.get_speed_label()}", 30, (screen_height // 2 + 120), 270, 80, font, (70, 70, 70), (245, 245, 245))
+            draw_button(screen, heatmap_text[heatmap_toggle], 330, (screen_height // 2 + 120), 270, 80, font, (70, 70, 70), (245, 245, 245))
+
+            # Add Train Learner Button
+            if(not any_terrain_made):
+                draw_button(screen, train_text[train_toggle], 330, (screen_height // 2 + 30), 270, 80, font, (100, 100, 100), (70, 70, 70))
+            else:
+                draw_button(screen, train_text[train_toggle], 330, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
+
+            # Add start button
+            if(not any_terrain_made):
+                draw_button(screen, run_text[run_toggle], 660, (screen_height // 2 + 30), 270, 80, font, (100, 100, 100), (70, 70, 70))
+            else:
+                draw_button(screen, run_text[run_toggle], 660, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
+
+            # Add weights toggle
+            draw_button(screen, weights_text[weights_toggle], 990, (screen_height // 2 + 30), 270, 80, font, (70, 70, 70), (245, 245, 245))
 
-        # Text that changes all the time:
-        episodes_text = font.render(f"Episode: {num_episodes}", True, (245, 245, 245))
-        pygame.draw.rect(screen, (0, 0, 0), (30, 1000, episodes_text.get_width()+50, episodes_text.get_height()))
-        screen.blit(episodes_text, (30, 1000))
-        
-        steps_text = font.render(f"Step: {num_steps}", True, (245, 245, 245))
-        pygame.draw.rect(screen, (0, 0, 0), (30, 1050, steps_text.get_width()+50, steps_text.get_height()))
-        screen.blit(steps_text, (30, 1050))
+        else:
+            # Only the tiles the player left or entered need redrawing
+            dirty_rects = r_environment.draw_dirty(screen, weights_toggle)
+            if(heatmap_toggle):
+                # The whole Q-table can change every step, so the heatmap is redrawn every frame (it's a single blit)
+                dirty_rects.append(heatmap.draw(screen, learner.Q_table))
+            else:
+                dirty_rects += r_learner.draw_dirty(screen, weights_toggle, custom_weight=state_weight, direction=direction)
+        profiler.lap('draw_map')
+
+        # Text that changes all the time, only redrawn when its value does:
+        status_rects = [
+            draw_status_line(screen, f"Episode: {num_episodes}", 30, 1000, font),
+            draw_status_line(screen, f"Step: {num_steps}", 30, 1050, font)
+        ]
 
         explore = "{:.4g}".format(float(learner.get_learner_preferences(inp_exploration_rate_OPT=1)[0]))
-        explore_text = font.render(f"Exploration Rate: {explore}", True, (245, 245, 245))
-        pygame.draw.rect(screen, (0, 0, 0), (30, 1100, explore_text.get_width()+50, explore_text.get_height()))
-        screen.blit(explore_text, (30, 1100))
+        status_rects.append(draw_status_line(screen, f"Exploration Rate: {explore}", 30, 1100, font))
 
         convergence = "{:.4g}".format(float(convergence))
-        convergence_text = font.render(f"Q-Table Convergence (MSE): {convergence}", True, (245, 245, 245))
-        pygame.draw.rect(screen, (0, 0, 0), (30, 1150, convergence_text.get_width()+50, convergence_text.get_height()))
-        screen.blit(convergence_text, (30, 1150))
+        status_rects.append(draw_status_line(screen, f"Q-Table Convergence (MSE): {convergence}", 30, 1150, font))
+
+        if profiler.enabled:
+            for line_number, line in enumerate(profiler.get_summary_lines()):
+                status_rects.append(draw_status_line(screen, line, 700, 1160 + line_number * 35, profile_font))
+        profiler.lap('hud')
+
+        if dirty_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects + [rect for rect in status_rects if rect is not None])
+        profiler.lap('flip')
 
         for event in pygame.event.get():
-            
+        
             if event.type == pygame.QUIT:
+                profiler.stop_capture()
+                if checkpoint_path is not None and any_terrain_made:
+                    save_progress(checkpoint_path)
+                if qcache is not None and replay_player is None:
+                    save_q_cache()
+                if worker is not None:
+                    worker.close()
+                if recorder is not None:
+                    recorder.close()
+                if profiler.enabled:
+                    print(shared_text_cache)
                 pygame.quit()
                 exit()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                heatmap_toggle = not heatmap_toggle
+                full_redraw = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p and profiler.enabled:
+                profiler.start_capture(args.profile_seconds)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_s and checkpoint_path is not None:
+                save_progress(checkpoint_path)
+            elif event.type == pygame.KEYDOWN and replay_player is not None:
+                # Left/Right step through episodes, Up/Down jump 100 at a time, Home/End go to the first/last, or type an episode number and press Enter
+                if event.key == pygame.K_RIGHT:
+                    seek_replay(replay_player.position + 1)
+                elif event.key == pygame.K_LEFT:
+                    seek_replay(replay_player.position - 1)
+                elif event.key == pygame.K_UP:
+                    seek_replay(min(replay_player.position + 100, len(replay_reader) - 1))
+                elif event.key == pygame.K_DOWN:
+                    seek_replay(max(replay_player.position - 100, 0))
+                elif event.key == pygame.K_HOME:
+                    seek_replay(0)
+                elif event.key == pygame.K_END:
+                    seek_replay(len(replay_reader) - 1)
+                elif event.unicode.isdigit():
+                    replay_seek_text += event.unicode
+                elif event.key == pygame.K_RETURN and replay_seek_text:
+                    try:
+                        seek_replay(replay_reader.find_episode(int(replay_seek_text)))
+                    except KeyError as error:
+                        print(error.args[0])
+                    replay_seek_text = ""
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if is_button_clicked(event.pos, b_wall_add_rect): # Clicked to add a wall
                     any_terrain_made = True
                     if(not terrain_set_toggle): # Simulation hasn't started yet
-                        
-                        # Generate random terrain
-                        b_environment.gen_new_map()
-                        m_pointer = b_environment.get_game_map()
-                        player_loc = b_environment.get_player_location()
-                        for row in range(len(m_pointer)):
-                            for col in range(len(m_pointer)):
-                                tile = m_pointer[row][col]
-                                rand = random.random()
-                                if(tile == 'floor' and rand < 0.25 and not (row, col) == player_loc):
-                                    tile = 'wall'
-                                m_pointer[row][col] = tile
-                        
-                        # Set terrain (and weights internally) for both maps
-                        b_learner.set_game_map(m_pointer)
-                        b_environment.set_game_map(m_pointer)
+                    
+                        # Generate a random maze that's always solvable, and use the same one on both maps
+                        maze_tiles = generate_for_board(b_environment, method=args.maze, wall_rate=args.wall_rate, seed=maze_rng)
+                        b_learner.set_game_map(maze_tiles)
+                        if(qcache is not None):
+                            load_cached_q_table()
 
                 elif is_button_clicked(event.pos, b_start_rect): # Clicked start
                     if(not terrain_set_toggle): # Simulation hasn't started yet
@@ -268,7 +487,7 @@ while True:
                         weights_toggle = True
                     else:
                         weights_toggle = False
-                elif is_button_clicked(event.pos, b_train_learner):
+                elif is_button_clicked(event.pos, b_train_learner) and replay_player is None:
 
                     # Now that we're going to train, make the terrain set
                     if(not terrain_set_toggle):
@@ -279,10 +498,32 @@ while True:
 
                     else:
                         train_toggle = False
+
+                    if(qcache is not None and not qcache_loaded):
+                        load_cached_q_table()
+
+                    if(args.record is not None and recorder is None and not args.worker):
+                        recorder = TraceRecorder(args.record, b_environment)
+                        trainer.recorder = recorder
+
+                    if(args.worker):
+                        if(worker is None):
+                            # The learner reads the worker's shared Q-table from now on, so running the model sees the latest training
+                            worker = TrainingWorker(b_environment, learner, counters=trainer.get_counters(), trace_path=args.record)
+                            worker.set_speed(scheduler.get_steps_per_second())
+                            learner.Q_table = worker.get_q_table()
+                        if(train_toggle):
+                            worker.start()
+                        else:
+                            worker.stop()
+                elif is_button_clicked(event.pos, b_heatmap_rect):
+                    heatmap_toggle = not heatmap_toggle
                 elif is_button_clicked(event.pos, b_double_speed_rect):
-                    if(speed_toggle):
-                        speed_toggle = False
-                    else:
-                        speed_toggle = True            
+                    scheduler.next_speed()
+                    if(worker is not None):
+                        worker.set_speed(scheduler.get_steps_per_second())
+
+                # Buttons may have changed their labels or colors
+                full_redraw = True
 
-        pygame.display.flip()
+        profiler.lap('events')
@@ -0,0 +1,232 @@
+from functools import lru_cache
+import numpy as np
+from board import TILE_CODES, ACTION_OFFSETS
+
+# Maze generation for Boards. Mazes are built as uint8 tile arrays (same codes as Board.tiles) with a wall border,
+# either by filling the inside with random walls or by carving corridors with a recursive backtracker.
+# Every maze handed back is solvable: random mazes are checked with a flood fill from the start and either generated
+# again or repaired by knocking down walls towards the goal, and backtracker mazes just have the goal joined onto a corridor.
+
+MAZE_METHODS = ('random', 'backtracker')
+
+# Fill in the Board's default start and goal for any that weren't given
+def default_locations(map_size, start=None, goal=None):
+    start = tuple(start) if start is not None else (1, 1)
+    goal = tuple(goal) if goal is not None else (map_size - 1, map_size - 2)
+    return start, goal
+
+# A batch of empty maps of shape (count, map_size, map_size): floor with a wall border
+def empty_tiles(count, map_size):
+    tiles = np.full((count, map_size, map_size), TILE_CODES['floor'], dtype=np.uint8)
+    tiles[:, 0, :] = TILE_CODES['wall']
+    tiles[:, -1, :] = TILE_CODES['wall']
+    tiles[:, :, 0] = TILE_CODES['wall']
+    tiles[:, :, -1] = TILE_CODES['wall']
+    return tiles
+
+# Tiles next to any tile in the mask, for a single map or a batch of them
+def grow(mask):
+    grown = mask.copy()
+    grown[..., 1:, :] |= mask[..., :-1, :]
+    grown[..., :-1, :] |= mask[..., 1:, :]
+    grown[..., :, 1:] |= mask[..., :, :-1]
+    grown[..., :, :-1] |= mask[..., :, 1:]
+    return grown
+
+# Neighbors of every tile of a map as flat indices, shape (map_size * map_size, actions). Moves off the edge lead back
+# to the tile itself, so a flood fill (which has already reached that tile) never steps off one map of a batch into the next
+@lru_cache(maxsize=8)
+def neighbor_table(map_size):
+    rows, cols = np.divmod(np.arange(map_size * map_size), map_size)
+    table = np.empty((map_size * map_size, len(ACTION_OFFSETS)), dtype=np.intp)
+    for action, (d_row, d_col) in enumerate(ACTION_OFFSETS):
+        new_rows, new_cols = rows + d_row, cols + d_col
+        inside = (new_rows >= 0) & (new_rows < map_size) & (new_cols >= 0) & (new_cols < map_size)
+        table[:, action] = np.where(inside, new_rows * map_size + new_cols, rows * map_size + cols)
+    return table
+
+# Flood fill from the start over a single map or a batch of maps, returns a mask of every tile the player can get to
+# The player only walks on floor and the goal ends the episode, so nothing is reached through the goal
+# Pass reached to carry on from an earlier fill (after knocking down a wall, for example)
+# A BFS over flat tile indices, like solver.shortest_distances, so each tile is only looked at when the fill reaches it
+def reachable(tiles, start, reached=None):
+    map_size = tiles.shape[-1]
+    map_tiles = map_size * map_size
+    flat_tiles = tiles.ravel()
+    floor = flat_tiles == TILE_CODES['floor']
+    passable = floor | (flat_tiles == TILE_CODES['goal'])
+    if reached is None:
+        reached = np.zeros(tiles.shape, dtype=bool)
+        reached[..., start[0], start[1]] = True
+    else:
+        reached = reached.copy()
+    flat_reached = reached.ravel()
+    neighbors_of = neighbor_table(map_size)
+
+    frontier = np.flatnonzero(flat_reached & floor)
+    slot = np.empty(flat_tiles.size, dtype=np.intp) # scratch space to drop repeated neighbors without sorting
+    while frontier.size:
+        map_start = frontier - frontier % map_tiles
+        neighbors = (neighbors_of[frontier - map_start] + map_start[:, None]).ravel()
+        neighbors = neighbors[passable[neighbors] & ~flat_reached[neighbors]]
+
+        # A tile next to several frontier tiles is listed once for each, keep only the last listing
+        positions = np.arange(neighbors.size)
+        slot[neighbors] = positions
+        neighbors = neighbors[slot[neighbors] == positions]
+
+        flat_reached[neighbors] = True
+        frontier = neighbors[floor[neighbors]]
+    return reached
+
+# Whether the goal can be reached from the start, a bool for one map or a bool array for a batch
+def is_solvable(tiles, start, goal):
+    return reachable(tiles, start)[..., goal[0], goal[1]]
+
+# Make a single map solvable in place by knocking down walls, each time the inside wall next to the reachable area
+# that is closest to the goal, until the goal can be reached. Raises ValueError if the goal can't be reached at all.
+# Pass reached to start from a flood fill that was already done, see reachable()
+def repair(tiles, start, goal, reached=None):
+    map_size = tiles.shape[0]
+    rows, cols = np.indices(tiles.shape)
+    distance_to_goal = (np.abs(rows - goal[0]) + np.abs(cols - goal[1])).ravel()
+    breakable = np.zeros(tiles.shape, dtype=bool)
+    breakable[1:map_size - 1, 1:map_size - 1] = True
+
+    if tiles[start] != TILE_CODES['floor']:
+        tiles[start] = TILE_CODES['floor']
+        reached = None
+    reached = reachable(tiles, start) if reached is None else reached.copy()
+    while not reached[goal]:
+        candidates = np.flatnonzero(grow(reached & (tiles == TILE_CODES['floor'])) & (tiles == TILE_CODES['wall']) & breakable)
+        if candidates.size == 0:
+            raise ValueError(f"goal {goal} can't be reached from {start}")
+        knocked_down = candidates[np.argmin(distance_to_goal[candidates])]
+        tiles.flat[knocked_down] = TILE_CODES['floor']
+        reached.flat[knocked_down] = True
+        reached = reachable(tiles, start, reached)
+    return tiles
+
+# Join the goal of a backtracker maze onto its corridors in place. Every carved tile is already connected to the start,
+# so a straight corridor (down or up, then across) from the goal's inside neighbor to the nearest carved tile is enough.
+# Falls back to repair() for goals inside the map, which may sit on a corridor and cut it, or in a corner.
+def join_goal(tiles, start, goal):
+    map_size = tiles.shape[0]
+    neighbors = [(goal[0] + d_row, goal[1] + d_col) for d_row, d_col in ACTION_OFFSETS]
+    neighbors = [(row, col) for row, col in neighbors if 0 < row < map_size - 1 and 0 < col < map_size - 1]
+    on_border = goal[0] in (0, map_size - 1) or goal[1] in (0, map_size - 1)
+    if not on_border or not neighbors:
+        return repair(tiles, start, goal)
+    if any(tiles[neighbor] == TILE_CODES['floor'] for neighbor in neighbors):
+        return tiles
+
+    row, col = neighbors[0]
+    floor_rows, floor_cols = np.nonzero(tiles == TILE_CODES['floor'])
+    nearest = np.argmin(np.abs(floor_rows - row) + np.abs(floor_cols - col))
+    target_row, target_col = int(floor_rows[nearest]), int(floor_cols[nearest])
+
+    corridor = [(step_row, col) for step_row in range(min(row, target_row), max(row, target_row) + 1)]
+    corridor += [(target_row, step_col) for step_col in range(min(col, target_col), max(col, target_col) + 1)]
+    if goal in corridor:
+        return repair(tiles, start, goal)
+    corridor_rows, corridor_cols = zip(*corridor)
+    tiles[corridor_rows, corridor_cols] = TILE_CODES['floor']
+    return tiles
+
+# A batch of maps with a random share of the inside floor turned into walls (not checked for solvability)
+def random_fill(count, map_size, wall_rate, rng, start, goal):
+    tiles = empty_tiles(count, map_size)
+    tiles[(tiles == TILE_CODES['floor']) & (rng.random(tiles.shape) < wall_rate)] = TILE_CODES['wall']
+    tiles[:, start[0], start[1]] = TILE_CODES['floor']
+    tiles[:, goal[0], goal[1]] = TILE_CODES['goal']
+    return tiles
+
+# A single map of corridors carved by a recursive backtracker (depth-first search with a stack), starting from the start
+# Corridors run between cells two tiles apart, so the goal may still need to be joined on with join_goal()
+def backtracker(map_size, rng, start, goal):
+    # Carving is tracked in plain lists and written into the array once at the end
+    visited = [[False] * map_size for _ in range(map_size)]
+    visited[start[0]][start[1]] = True
+    carved = [start]
+
+    # One random number per cell is enough, since each cell is carved into exactly once
+    choices = rng.random(map_size * map_size).tolist()
+    choice_index = 0
+    stack = [start]
+    while stack:
+        row, col = stack[-1]
+        options = []
+        for d_row, d_col in ((0, 2), (-2, 0), (0, -2), (2, 0)):
+            new_row = row + d_row
+            new_col = col + d_col
+            if 0 < new_row < map_size - 1 and 0 < new_col < map_size - 1 and not visited[new_row][new_col]:
+                options.append((new_row, new_col))
+        if not options:
+            stack.pop()
+            continue
+
+        new_row, new_col = options[int(choices[choice_index] * len(options))]
+        choice_index += 1
+        visited[new_row][new_col] = True
+        carved.append(((row + new_row) // 2, (col + new_col) // 2))
+        carved.append((new_row, new_col))
+        stack.append((new_row, new_col))
+
+    tiles = np.full((map_size, map_size), TILE_CODES['wall'], dtype=np.uint8)
+    carved_rows, carved_cols = zip(*carved)
+    tiles[carved_rows, carved_cols] = TILE_CODES['floor']
+    tiles[goal] = TILE_CODES['goal']
+    return tiles
+
+# Generate a batch of solvable mazes, returns a uint8 array of shape (count, map_size, map_size)
+def generate_mazes(
+    count, # how many mazes to make
+    map_size=10, # width and height of each maze in tiles
+    method='random', # 'random' fills the inside with walls, 'backtracker' carves corridors
+    wall_rate=0.25, # share of the inside floor turned into walls by the 'random' method
+    seed=None, # int seed or np.random.Generator, for repeatable mazes
+    start=None, # (row, col) the player starts from, defaults to the Board's start
+    goal=None, # (row, col) of the goal, defaults to the Board's goal
+    unsolvable='repair', # 'repair' knocks down walls in unsolvable random mazes, 'reject' generates them again
+    max_attempts=100 # rounds of rejection before giving up with a ValueError
+):
+    if method not in MAZE_METHODS:
+        raise ValueError(f"unknown maze method {method!r}, expected one of {MAZE_METHODS}")
+    rng = np.random.default_rng(seed)
+    start, goal = default_locations(map_size, start, goal)
+
+    # Backtracker mazes connect every cell, so at most the goal has to be joined on, no flood fill needed
+    if method == 'backtracker':
+        tiles = np.empty((count, map_size, map_size), dtype=np.uint8)
+        for index in range(count):
+            tiles[index] = join_goal(backtracker(map_size, rng, start, goal), start, goal)
+        return tiles
+
+    tiles = random_fill(count, map_size, wall_rate, rng, start, goal)
+    reached = reachable(tiles, start)
+    failed = np.flatnonzero(~reached[:, goal[0], goal[1]])
+    if unsolvable == 'reject':
+        for _ in range(max_attempts):
+            if failed.size == 0:
+                return tiles
+            tiles[failed] = random_fill(failed.size, map_size, wall_rate, rng, start, goal)
+            failed = failed[~is_solvable(tiles[failed], start, goal)]
+        if failed.size:
+            raise ValueError(f"{failed.size} mazes were still unsolvable after {max_attempts} attempts, try a lower wall_rate")
+    else:
+        for index in failed.tolist():
+            repair(tiles[index], start, goal, reached[index])
+    return tiles
+
+# Generate a single solvable maze, takes the same settings as generate_mazes
+def generate_maze(map_size=10, **kwargs):
+    return generate_mazes(1, map_size, **kwargs)[0]
+
+# Generate a solvable maze for a board using its size, start, and goal, and set it as the board's map
+def generate_for_board(board, method='random', wall_rate=0.25, seed=None, unsolvable='repair'):
+    tiles = generate_maze(
+        board.map_size, method=method, wall_rate=wall_rate, seed=seed,
+        start=board.start_location, goal=board.goal_location, unsolvable=unsolvable
+    )
+    board.set_game_map(tiles)
+    return tiles
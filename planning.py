@@ -0,0 +1,102 @@
+import heapq
+
+class Planner:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Model-based planning for a Q_Learner. The board is deterministic, so every observed transition is remembered
+    # and replayed as simulated experience: planning_steps extra updates after each real step.
+    # Plain Dyna-Q picks remembered transitions at random, prioritized sweeping updates the ones with the largest
+    # TD-error first and then re-checks the transitions that lead into the state whose value just changed.
+
+    def __init__(
+        self,
+        planning_steps, # simulated updates made after every real step
+        prioritized=False, # use prioritized sweeping instead of uniform Dyna-Q
+        priority_threshold=1e-4 # transitions with a smaller TD-error than this aren't queued
+    ):
+        self.planning_steps = planning_steps
+        self.prioritized = prioritized
+        self.priority_threshold = priority_threshold
+
+        self.model = {} # (state, action) -> (reward, next_state, done)
+        self.model_keys = [] # every (state, action) in the model, for sampling
+        self.predecessors = {} # state -> set of (state, action) known to lead to it
+
+        # Heap of (-priority, insertion order, state, action) for prioritized sweeping
+        self.queue = []
+        self.queue_counter = 0
+        return
+
+    def __len__(self):
+        return len(self.model)
+
+    ###### ~~~~~~~~~~~~~~~~ ######
+    ###### Helper Functions ######
+    ###### ~~~~~~~~~~~~~~~~ ######
+
+    # How far the learner's Q-value for a transition is from its Bellman target, terminal transitions don't look ahead
+    def td_error(self, learner, state, action, reward, next_state, done=False):
+        target = reward if done else reward + learner.rewards_rate * learner.Q_table[next_state].max()
+        return target - learner.Q_table[state, action]
+
+    def push(self, priority, state, action):
+        heapq.heappush(self.queue, (-priority, self.queue_counter, state, action))
+        self.queue_counter += 1
+
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+    ###### Planning Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+
+    # Remember a real transition (call after the learner has made its own update for it)
+    def observe(self, learner, state, action, reward, next_state, done=False):
+        action = int(action)
+        key = (state, action)
+        previous = self.model.get(key)
+        if previous is None:
+            self.model_keys.append(key)
+        elif previous[1] != next_state:
+            self.predecessors[previous[1]].discard(key)
+        self.model[key] = (reward, next_state, done)
+        self.predecessors.setdefault(next_state, set()).add(key)
+
+        if self.prioritized:
+            priority = abs(self.td_error(learner, state, action, reward, next_state, done))
+            if priority > self.priority_threshold:
+                self.push(priority, state, action)
+
+    # Make this step's simulated updates
+    def plan(self, learner):
+        if self.prioritized:
+            self.sweep(learner)
+        elif self.model_keys:
+            picks = learner.rng.integers(0, len(self.model_keys), size=self.planning_steps).tolist()
+            for index in picks:
+                state, action = self.model_keys[index]
+                reward, next_state, done = self.model[(state, action)]
+                learner.update_q_value(state, action, reward, next_state, done)
+
+    # Prioritized sweeping: update the most urgent transitions, then queue up whatever leads into the states that changed
+    def sweep(self, learner):
+        for _ in range(self.planning_steps):
+            if not self.queue:
+                break
+            _, _, state, action = heapq.heappop(self.queue)
+            reward, next_state, done = self.model[(state, action)]
+            learner.update_q_value(state, action, reward, next_state, done)
+
+            for previous_state, previous_action in self.predecessors.get(state, ()):
+                previous_reward, _, previous_done = self.model[(previous_state, previous_action)]
+                if previous_done: # a terminal transition doesn't depend on the value of where it leads
+                    continue
+                priority = abs(self.td_error(learner, previous_state, previous_action, previous_reward, state))
+                if priority > self.priority_threshold:
+                    self.push(priority, previous_state, previous_action)
+
+    def clear(self):
+        self.model.clear()
+        self.model_keys.clear()
+        self.predecessors.clear()
+        self.queue.clear()
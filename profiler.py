@@ -0,0 +1,123 @@
+import cProfile
+import time
+from collections import deque
+
+class FrameProfiler:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Times each phase of the visualizer's frame and keeps rolling averages over the last few frames.
+    # The frame is split up with lap(): each call charges the time since the previous lap to the named phase.
+    # It can also run cProfile for a few seconds and dump the capture to disk.
+    # When disabled every call returns straight away, so main.py can leave the calls in.
+
+    # Phases in the order they happen in a frame, for display
+    phases = ('wait', 'simulation', 'draw_map', 'hud', 'flip', 'events')
+
+    def __init__(
+        self,
+        enabled=True, # False turns every call into a no-op
+        window=120 # frames the rolling averages cover
+    ):
+        self.enabled = enabled
+        self.window = window
+
+        self.frame_times = deque(maxlen=window)
+        self.frame_steps = deque(maxlen=window)
+        self.phase_times = {name: deque(maxlen=window) for name in self.phases}
+        self.current = {name: 0.0 for name in self.phases} # time charged to each phase so far this frame
+
+        self.frame_start = time.perf_counter()
+        self.last_lap = self.frame_start
+
+        self.capture = None
+        self.capture_end = None
+        self.capture_path = None
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Frames per second over the window
+    def get_fps(self):
+        total = sum(self.frame_times)
+        return len(self.frame_times) / total if total > 0 else 0.0
+
+    # Simulation steps per second over the window
+    def get_steps_per_second(self):
+        total = sum(self.frame_times)
+        return sum(self.frame_steps) / total if total > 0 else 0.0
+
+    # Average milliseconds per frame spent in each phase
+    def get_phase_ms(self):
+        return {name: sum(times) / len(times) * 1000 if times else 0.0 for name, times in self.phase_times.items()}
+
+    def is_capturing(self):
+        return self.capture is not None
+
+    # Text for the HUD: a line of rates, then the phase times split over two lines
+    def get_summary_lines(self):
+        phase_ms = self.get_phase_ms()
+        phase_text = [f"{name} {phase_ms[name]:.1f}" for name in self.phases]
+        capture = " (profiling)" if self.is_capturing() else ""
+        return [
+            f"FPS: {self.get_fps():.1f}  Steps/s: {self.get_steps_per_second():,.0f}{capture}",
+            "ms: " + "  ".join(phase_text[:3]),
+            "ms: " + "  ".join(phase_text[3:])
+        ]
+
+    ###### ~~~~~~~~~~~~~~~~ ######
+    ###### Timing Functions ######
+    ###### ~~~~~~~~~~~~~~~~ ######
+
+    # Charge the time since the last lap to a phase
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[name] += now - self.last_lap
+        self.last_lap = now
+
+    # Close off the frame that just finished (the time since the last lap counts as waiting) and start the next one
+    # num_steps is how many simulation steps the finished frame ran
+    def next_frame(self, num_steps=0):
+        if not self.enabled:
+            return
+        self.lap('wait')
+        now = self.last_lap
+        self.frame_times.append(now - self.frame_start)
+        self.frame_steps.append(num_steps)
+        for name, elapsed in self.current.items():
+            self.phase_times[name].append(elapsed)
+            self.current[name] = 0.0
+        self.frame_start = now
+
+        if self.capture is not None and now >= self.capture_end:
+            self.stop_capture()
+
+    ###### ~~~~~~~~~~~~~~~~~ ######
+    ###### Capture Functions ######
+    ###### ~~~~~~~~~~~~~~~~~ ######
+
+    # Run cProfile over the next few seconds, the capture is written to path (open it with pstats or snakeviz)
+    # Only this process is profiled, a --worker training process isn't included
+    def start_capture(self, seconds, path=None):
+        if not self.enabled or self.capture is not None:
+            return
+        self.capture_path = path if path is not None else time.strftime("profile_%Y%m%d_%H%M%S.prof")
+        self.capture_end = time.perf_counter() + seconds
+        self.capture = cProfile.Profile()
+        self.capture.enable()
+
+    # Stop profiling early (or on time) and write the capture, returns where it was written
+    def stop_capture(self):
+        if self.capture is None:
+            return None
+        self.capture.disable()
+        self.capture.dump_stats(self.capture_path)
+        print(f"Wrote profile to {self.capture_path}")
+        self.capture = None
+        return self.capture_path
@@ -0,0 +1,190 @@
+import hashlib
+import json
+from collections import OrderedDict
+import numpy as np
+from maze import grow
+from qtable import SparseQTable
+from trainer import Trainer
+from solver import regret
+
+# Cache of trained Q-tables for the mazes a learner has already seen, keyed by a hash of the maze and the learner's settings.
+# A maze that comes back gets its trained table straight away, and a new maze starts from the table of the most similar
+# cached maze (fewest differing tiles) instead of from zero. Only the least recently used tables are dropped when it fills up.
+
+# Learner preferences that change the values a Q-table converges to, the exploration settings only change how it gets there
+KEY_PREFERENCES = ('learning_rate', 'rewards_rate')
+
+# Everything about a board and learner, other than the tiles, that has to match for a table to be reused or warm-started from
+def settings_for(board, learner):
+    settings = {name: float(getattr(learner, name)) for name in KEY_PREFERENCES}
+    settings['map_size'] = board.map_size
+    settings['total_actions'] = learner.total_actions
+    settings['start_location'] = list(board.start_location)
+    settings['weight_map'] = {name: board.weight_map[name] for name in sorted(board.weight_map)}
+    return settings
+
+def settings_hash(settings):
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+# Cache key of a board's maze with a learner's settings, and the hash of just the settings
+def cache_keys(board, learner):
+    settings = settings_hash(settings_for(board, learner))
+    digest = hashlib.sha1(board.tiles.tobytes())
+    digest.update(settings.encode('ascii'))
+    return digest.hexdigest(), settings
+
+# Copy of a learner's Q-table as a dense array, sparse tables are filled in from the rows they've allocated
+def dense_q_table(learner):
+    if isinstance(learner.Q_table, SparseQTable):
+        table = np.zeros((learner.total_states, learner.total_actions), dtype=float)
+        states = np.array(learner.Q_table.visited_states(), dtype=np.int64)
+        if states.size:
+            table[states] = learner.Q_table.get_rows(states)
+        return table
+    return np.array(learner.Q_table, dtype=float)
+
+# Put a dense table into a learner, in place so a table shared with a training worker stays shared
+def load_q_table(learner, table):
+    if isinstance(learner.Q_table, SparseQTable):
+        learner.Q_table = SparseQTable(learner.total_states, learner.total_actions)
+        for state in np.flatnonzero(np.any(table != 0, axis=1)).tolist():
+            learner.Q_table[state] = table[state]
+    else:
+        learner.Q_table[:] = table
+
+class QTableCache:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Each entry holds the maze's tiles, the hash of its settings, its trained Q-table, and the exploration rate it was left at.
+    # Entries are kept in least to most recently used order.
+
+    def __init__(
+        self,
+        capacity=32, # most Q-tables kept, the least recently used one is dropped to make room
+        max_warm_distance=None # most differing tiles a cached maze can have and still be warm-started from, None for no limit
+    ):
+        self.capacity = capacity
+        self.max_warm_distance = max_warm_distance
+        self.entries = OrderedDict()
+
+        # How lookups went, for reporting
+        self.hits = 0
+        self.warm_starts = 0
+        self.misses = 0
+        return
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    ###### ~~~~~~~~~~~~~~~ ######
+    ###### Cache Functions ######
+    ###### ~~~~~~~~~~~~~~~ ######
+
+    # Save a learner's table for the maze on the board, returns its key
+    def store(self, board, learner):
+        key, settings = cache_keys(board, learner)
+        self.entries[key] = {
+            'tiles': board.tiles.copy(),
+            'settings': settings,
+            'q_table': dense_q_table(learner),
+            'exploration_rate': float(learner.exploration_rate)
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return key
+
+    # Cached entry with the fewest tiles different from the board's among those with the same settings, and that distance
+    def nearest(self, board, learner):
+        _, settings = cache_keys(board, learner)
+        keys = [key for key, entry in self.entries.items() if entry['settings'] == settings]
+        if not keys:
+            return None, None
+        cached_tiles = np.stack([self.entries[key]['tiles'] for key in keys])
+        distances = np.count_nonzero((cached_tiles != board.tiles).reshape(len(keys), -1), axis=1)
+        closest = int(np.argmin(distances))
+        if self.max_warm_distance is not None and distances[closest] > self.max_warm_distance:
+            return None, None
+        return keys[closest], int(distances[closest])
+
+    # Give the learner the best table the cache has for the board's maze, returns 'hit', 'warm', or 'miss'
+    # A hit restores the trained table and its exploration rate. A warm start copies the nearest maze's table but clears
+    # every state on or next to a tile that changed, since their values were learned for a different layout.
+    # A miss leaves the learner with a zeroed table.
+    def load(self, board, learner):
+        key, _ = cache_keys(board, learner)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            load_q_table(learner, entry['q_table'])
+            learner.exploration_rate = entry['exploration_rate']
+            self.hits += 1
+            return 'hit'
+
+        nearest_key, _ = self.nearest(board, learner)
+        if nearest_key is None:
+            load_q_table(learner, np.zeros((learner.total_states, learner.total_actions), dtype=float))
+            self.misses += 1
+            return 'miss'
+
+        self.entries.move_to_end(nearest_key)
+        nearest_entry = self.entries[nearest_key]
+        table = nearest_entry['q_table'].copy()
+        table[grow(nearest_entry['tiles'] != board.tiles).ravel()] = 0.0
+        load_q_table(learner, table)
+        self.warm_starts += 1
+        return 'warm'
+
+    ###### ~~~~~~~~~~~~~~ ######
+    ###### File Functions ######
+    ###### ~~~~~~~~~~~~~~ ######
+
+    # Write every entry to a .npz file, oldest first so loading it back keeps the LRU order
+    def save(self, path):
+        arrays = {}
+        index = []
+        for number, (key, entry) in enumerate(self.entries.items()):
+            arrays[f'tiles_{number}'] = entry['tiles']
+            arrays[f'q_table_{number}'] = entry['q_table']
+            index.append({'key': key, 'settings': entry['settings'], 'exploration_rate': entry['exploration_rate']})
+        arrays['index'] = np.array(json.dumps(index))
+        with open(path, 'wb') as cache_file:
+            np.savez(cache_file, **arrays)
+
+    # Add the entries of a file written by save(), keeping within capacity
+    def load_file(self, path):
+        with np.load(path) as data:
+            for number, info in enumerate(json.loads(str(data['index']))):
+                self.entries[info['key']] = {
+                    'tiles': data[f'tiles_{number}'],
+                    'settings': info['settings'],
+                    'q_table': data[f'q_table_{number}'],
+                    'exploration_rate': info['exploration_rate']
+                }
+                self.entries.move_to_end(info['key'])
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+# Train across a list of mazes in order (a curriculum), reusing and warm-starting Q-tables through the cache.
+# make_learner() builds a fresh learner for the board, each maze trains until its greedy path is optimal or max_episodes run out.
+# Returns one dict per maze: how the cache lookup went, how many episodes it trained, and the regret it finished with.
+def train_curriculum(board, mazes, make_learner, cache, max_episodes=2000, max_steps=None):
+    results = []
+    for tiles in mazes:
+        board.set_game_map(np.array(tiles, dtype=np.uint8))
+        learner = make_learner(board)
+        status = cache.load(board, learner)
+
+        episodes = 0
+        if status != 'hit':
+            episodes = len(Trainer(board, learner, max_steps=max_steps).run_until_optimal(max_episodes))
+        key = cache.store(board, learner)
+        results.append({'key': key, 'cache': status, 'episodes': episodes, 'regret': regret(board, learner)})
+    return results
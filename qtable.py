@@ -0,0 +1,112 @@
+import numpy as np
+
+class SparseQTable:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Q-table storage that only allocates rows for states that have been written to.
+    # Rows live in fixed-size chunks so they never move, and a dict maps each state to its row.
+    # Reading a state that was never written returns a shared row of zeros, same as a fresh dense table.
+
+    def __init__(
+        self,
+        total_states, # positive int - total number of states the table could hold
+        total_actions, # positive int - number of action values per state
+        chunk_rows=4096 # rows allocated at a time once the current chunk fills up
+    ):
+        self.total_states = total_states
+        self.total_actions = total_actions
+        self.chunk_rows = chunk_rows
+
+        self.row_index = {} # state -> row number across all chunks
+        self.chunks = []
+        self.zero_row = np.zeros(total_actions, dtype=float)
+        self.zero_row.flags.writeable = False
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    @property
+    def shape(self):
+        return (self.total_states, self.total_actions)
+
+    # Number of states that have a row allocated
+    def __len__(self):
+        return len(self.row_index)
+
+    # Bytes used by the allocated chunks
+    @property
+    def nbytes(self):
+        return sum(chunk.nbytes for chunk in self.chunks)
+
+    # States that have a row allocated, in the order they were first written
+    def visited_states(self):
+        return list(self.row_index.keys())
+
+    # Get the row for a state, allocating it (filled with zeros) if it doesn't exist yet
+    def row(self, state):
+        index = self.row_index.get(state)
+        if index is None:
+            index = len(self.row_index)
+            if index == len(self.chunks) * self.chunk_rows:
+                self.chunks.append(np.zeros((self.chunk_rows, self.total_actions), dtype=float))
+            self.row_index[state] = index
+        return self.chunks[index // self.chunk_rows][index % self.chunk_rows]
+
+    # Q[state] reads a row without allocating, Q[state, action] reads a single value
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            state, action = key
+            index = self.row_index.get(state)
+            if index is None:
+                return 0.0
+            return self.chunks[index // self.chunk_rows][index % self.chunk_rows][action]
+        index = self.row_index.get(key)
+        if index is None:
+            return self.zero_row
+        return self.chunks[index // self.chunk_rows][index % self.chunk_rows]
+
+    # Q[state, action] = value or Q[state] = row, allocating the row if needed
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple):
+            state, action = key
+            self.row(state)[action] = value
+        else:
+            self.row(key)[:] = value
+
+    # Stack the rows for a batch of states into a (len(states), total_actions) array, without allocating
+    def get_rows(self, states):
+        return np.array([self[state] for state in states.tolist()], dtype=float).reshape(len(states), self.total_actions)
+
+    # Add values to a batch of (state, action) entries, allocating rows as needed
+    def add_values(self, states, actions, values):
+        for state, action, value in zip(states.tolist(), actions.tolist(), values.tolist()):
+            self.row(state)[action] += value
+
+    ###### ~~~~~~~~~~~~~~~~ ######
+    ###### Helper Functions ######
+    ###### ~~~~~~~~~~~~~~~~ ######
+
+    def copy(self):
+        table = SparseQTable(self.total_states, self.total_actions, self.chunk_rows)
+        table.row_index = dict(self.row_index)
+        table.chunks = [chunk.copy() for chunk in self.chunks]
+        return table
+
+    # Expand into a regular (total_states, total_actions) array, only sensible for small tables
+    def to_dense(self):
+        dense = np.zeros(self.shape, dtype=float)
+        for state in self.row_index:
+            dense[state] = self[state]
+        return dense
+
+    # Mean squared difference against another table over every state, same as np.mean((a - b) ** 2) on dense tables
+    def mean_squared_difference(self, other):
+        total = 0.0
+        for state in set(self.row_index).union(other.row_index):
+            total += float(np.sum((self[state] - other[state]) ** 2))
+        return total / (self.total_states * self.total_actions)
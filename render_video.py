@@ -0,0 +1,282 @@
+import argparse
+import os
+import queue
+import threading
+import time
+
+# Frames are drawn on offscreen surfaces, so pygame must never try to open a real window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+from board import Board
+from board_renderer import BoardRenderer, DEFAULT_COLORS
+from heatmap import QHeatmap, build_palette
+from learner import Q_Learner
+from trainer import Trainer
+from maze import MAZE_METHODS, generate_for_board
+
+# Pillow is only needed to write GIFs, raw frames work without it
+try:
+    from PIL import Image, GifImagePlugin
+except ImportError:
+    Image = None
+
+# Renders a training run to a GIF or a raw video file without a display. The work is a chain of generators:
+#   training_steps(): trains and yields where the player is after every step of the chosen episodes
+#   render_frames(): draws each of those steps offscreen and yields the frame's bytes
+#   FrameWriter: hands the frames to a writer thread through a bounded queue
+# Only a queue's worth of frames is ever held in memory, and encoding and disk writes happen while training carries on.
+
+# Palette index given to the player color, heatmap.py leaves the top few indices free
+PLAYER_INDEX = 253
+
+PADDING = 20
+TITLE_HEIGHT = 40
+
+# Parse episode lists like "1-5,10,100-110" into a set of episode numbers
+def parse_episodes(text):
+    episodes = set()
+    for part in text.split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            episodes.update(range(int(first), int(last) + 1))
+        else:
+            episodes.add(int(part))
+    return episodes
+
+# Width and height of a frame for boards of board_pixels pixels across
+def frame_size(map_size, board_pixels):
+    board_pixels = max(1, board_pixels // map_size) * map_size
+    return (board_pixels * 2 + PADDING * 3, board_pixels + TITLE_HEIGHT + PADDING)
+
+# Palette of the rendered frames: the heatmap's palette with the player color added
+def frame_palette(colors):
+    palette = build_palette(colors['wall'], colors['goal'])
+    palette[PLAYER_INDEX] = colors['player']
+    return palette
+
+###### ~~~~~~~~~~~~~~~~ ######
+###### Frame Generators ######
+###### ~~~~~~~~~~~~~~~~ ######
+
+# Train until the last chosen episode finishes, yielding (episode, step, location) after every step of a chosen episode
+# The location is where the step landed, so the step that reaches the goal shows the player on it
+def training_steps(trainer, episodes, frame_every=1):
+    last_episode = max(episodes)
+    board = trainer.board
+    while True:
+        if trainer.first_step:
+            trainer.step()
+            continue
+        episode = trainer.num_episodes
+        stats = trainer.step()
+        if episode in episodes:
+            step = stats['steps'] if stats is not None else trainer.num_steps
+            if stats is not None or step % frame_every == 0:
+                yield episode, step, board.state_to_location(trainer.reached_state)
+        if stats is not None and episode >= last_episode:
+            return
+
+# Draw every step onto an 8-bit canvas: the maze on the left, the learner's Q-table heatmap on the right
+# Yields the frame's bytes as palette indices ('P') or RGB ('RGB'), see the writers' pixel_format
+def render_frames(steps, board, learner, board_pixels=300, pixel_format='P'):
+    display_board = Board(map_size=board.map_size, start_location=board.start_location, goal_location=board.goal_location)
+    display_board.set_game_map(board.tiles.copy())
+
+    tile_size = max(1, board_pixels // board.map_size)
+    board_pixels = tile_size * board.map_size
+    environment = BoardRenderer(display_board, tile_size=tile_size, offset_x=PADDING, offset_y=TITLE_HEIGHT)
+    heatmap = QHeatmap(BoardRenderer(display_board, tile_size=tile_size, offset_x=PADDING * 2 + board_pixels, offset_y=TITLE_HEIGHT))
+
+    # The canvas shares the heatmap's palette (plus the player color), so the heatmap blits straight in and GIFs need no quantizing
+    canvas = pygame.Surface(frame_size(board.map_size, board_pixels), depth=8)
+    canvas.set_palette(frame_palette(environment.colors))
+    font = pygame.font.SysFont("Arial", 24, bold=True)
+
+    for episode, step, location in steps:
+        display_board.set_player_location(location)
+        canvas.fill((0, 0, 0))
+        environment.draw_map(canvas, False)
+        heatmap.draw(canvas, learner.Q_table)
+        canvas.blit(font.render(f"Episode: {episode}   Step: {step}", False, (255, 255, 255)), (PADDING, (TITLE_HEIGHT - 24) // 2))
+        yield pygame.image.tobytes(canvas, pixel_format)
+
+###### ~~~~~~~~~~~~~ ######
+###### Frame Writers ######
+###### ~~~~~~~~~~~~~ ######
+
+class RawFrameWriter:
+
+    # Appends every frame as raw RGB bytes, ready for ffmpeg:
+    #   ffmpeg -f rawvideo -pix_fmt rgb24 -s WIDTHxHEIGHT -r FPS -i frames.rgb video.mp4
+
+    pixel_format = 'RGB'
+
+    def __init__(self, path, size, fps):
+        self.path = path
+        self.size = size
+        self.fps = fps
+        self.file = open(path, 'wb')
+        return
+
+    def write_frame(self, frame):
+        self.file.write(frame)
+
+    def close(self):
+        self.file.close()
+
+    def describe(self):
+        width, height = self.size
+        return f"ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {self.fps} -i {self.path} video.mp4"
+
+class GifFrameWriter:
+
+    # Streams an animated GIF to disk one frame at a time. Every frame shares the global palette, so Pillow only
+    # has to compress each one (GifImagePlugin.getdata) rather than collecting them all to save at the end.
+
+    pixel_format = 'P'
+
+    def __init__(self, path, size, fps, palette):
+        if Image is None:
+            raise ImportError("Writing GIFs needs Pillow (pip install pillow), or write raw frames to a .rgb file instead")
+        self.path = path
+        self.size = size
+        self.fps = fps
+        self.palette = [channel for color in palette for channel in color] # flat list of 768 ints, the way Pillow takes it
+        self.frame_ms = max(20, round(1000 / fps / 10) * 10) # GIF delays are in hundredths of a second
+        self.file = open(path, 'wb')
+        self.header_written = False
+        return
+
+    def make_image(self, frame):
+        image = Image.frombytes('P', self.size, frame)
+        image.putpalette(self.palette)
+        return image
+
+    def write_frame(self, frame):
+        image = self.make_image(frame)
+        if not self.header_written:
+            header, _ = GifImagePlugin.getheader(image, self.palette)
+            self.file.write(b''.join(header))
+            self.file.write(b'!\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00') # loop forever
+            self.header_written = True
+        self.file.write(b''.join(GifImagePlugin.getdata(image, duration=self.frame_ms)))
+
+    def close(self):
+        self.file.write(b';')
+        self.file.close()
+
+    def describe(self):
+        return self.path
+
+class FrameWriter:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Feeds frames to a RawFrameWriter or GifFrameWriter on a background thread. The queue is bounded, so if the writer
+    # falls behind, write() waits for room instead of letting frames pile up in memory.
+
+    def __init__(
+        self,
+        writer, # RawFrameWriter or GifFrameWriter that does the encoding and file writes
+        queue_size=64 # most frames waiting to be written at once
+    ):
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.frames_written = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~ ######
+    ###### Writing Functions ######
+    ###### ~~~~~~~~~~~~~~~~~ ######
+
+    # Body of the writer thread, None in the queue means there are no more frames
+    def run(self):
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                self.writer.write_frame(frame)
+                self.frames_written += 1
+        except Exception as error:
+            self.error = error
+            # Keep draining so write() never blocks on a dead thread
+            while self.queue.get() is not None:
+                pass
+        finally:
+            self.writer.close()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"writing {self.writer.path} failed") from self.error
+
+    # Queue a frame, waits if the queue is full
+    def write(self, frame):
+        self.raise_error()
+        self.queue.put(frame)
+
+    # Write out whatever is still queued and close the file
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.raise_error()
+
+# Push every frame from a generator through a FrameWriter, returns the number of frames written
+def write_frames(frames, writer, queue_size=64):
+    frame_writer = FrameWriter(writer, queue_size)
+    try:
+        for frame in frames:
+            frame_writer.write(frame)
+    finally:
+        frame_writer.close()
+    return frame_writer.frames_written
+
+# Train on a board and render the chosen episodes to path: a .gif (needs Pillow), or raw RGB frames for any other extension
+def render_training(path, board, learner, episodes, board_pixels=300, frame_every=1, fps=30, queue_size=64, max_steps=None):
+    size = frame_size(board.map_size, board_pixels)
+    if path.lower().endswith('.gif'):
+        writer = GifFrameWriter(path, size, fps, frame_palette(DEFAULT_COLORS))
+    else:
+        writer = RawFrameWriter(path, size, fps)
+
+    trainer = Trainer(board, learner, max_steps=max_steps)
+    steps = training_steps(trainer, episodes, frame_every)
+    frames = render_frames(steps, board, learner, board_pixels, writer.pixel_format)
+    return write_frames(frames, writer, queue_size), writer
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train headlessly and render chosen episodes to a GIF or raw video frames")
+    parser.add_argument("--output", default="training.gif", help="a .gif (needs Pillow) or any other name for raw RGB frames to pipe into ffmpeg")
+    parser.add_argument("--episodes", type=parse_episodes, default=parse_episodes("1-3"), help="episodes to render, like 1-5,50,100-110")
+    parser.add_argument("--map-size", type=int, default=10, help="width and height of the maze in tiles")
+    parser.add_argument("--maze", choices=MAZE_METHODS, default="random", help="how the maze is generated")
+    parser.add_argument("--wall-rate", type=float, default=0.25, help="share of floor tiles turned into walls by the random maze")
+    parser.add_argument("--maze-seed", type=int, default=0, help="seed for the maze")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the learner's random actions")
+    parser.add_argument("--board-pixels", type=int, default=300, help="width of each board in the video")
+    parser.add_argument("--frame-every", type=int, default=1, help="only render every Nth step (the last step of an episode is always rendered)")
+    parser.add_argument("--fps", type=int, default=30, help="frame rate of the video")
+    parser.add_argument("--queue-size", type=int, default=64, help="most rendered frames waiting for the writer thread")
+    args = parser.parse_args()
+
+    pygame.font.init()
+    board = Board(map_size=args.map_size)
+    generate_for_board(board, method=args.maze, wall_rate=args.wall_rate, seed=args.maze_seed)
+    learner = Q_Learner(board.total_states, board.total_actions, inp_seed_OPT=args.seed)
+
+    start = time.perf_counter()
+    try:
+        num_frames, writer = render_training(args.output, board, learner, args.episodes, args.board_pixels, args.frame_every, args.fps, args.queue_size)
+    except ImportError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {num_frames} frames of {writer.size[0]}x{writer.size[1]} in {elapsed:.1f}s ({num_frames / elapsed:.0f} frames/s)")
+    print(writer.describe())
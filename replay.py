@@ -0,0 +1,53 @@
+import numpy as np
+
+class ReplayBuffer:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Fixed-capacity ring buffer of (state, action, reward, next_state, done) transitions, stored as parallel arrays.
+    # Once full, each new transition overwrites the oldest one.
+
+    def __init__(
+        self,
+        capacity # positive int - most transitions kept at once
+    ):
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=float)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+
+        self.position = 0 # where the next transition goes
+        self.size = 0 # how many slots hold a transition
+        return
+
+    def __len__(self):
+        return self.size
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    def add(self, state, action, reward, next_state, done):
+        position = self.position
+        self.states[position] = state
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.next_states[position] = next_state
+        self.dones[position] = done
+
+        self.position = (position + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    # Draw a batch of transitions uniformly (with replacement), returns (states, actions, rewards, next_states, dones) arrays
+    def sample(self, batch_size, rng):
+        indices = rng.integers(0, self.size, size=batch_size)
+        return self.states[indices], self.actions[indices], self.rewards[indices], self.next_states[indices], self.dones[indices]
+
+    def clear(self):
+        self.position = 0
+        self.size = 0
@@ -0,0 +1,77 @@
+import time
+
+class StepScheduler:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Decides how many simulation steps to run each rendered frame, so the simulation rate doesn't depend on the frame rate.
+    # Fixed speeds accumulate fractional steps between frames, "max" runs steps in chunks until the frame's time budget is spent.
+
+    # Label shown on the speed button -> steps per second, None means as fast as possible
+    speeds = (
+        ("1x", 10),
+        ("10x", 100),
+        ("1000x", 10000),
+        ("max", None)
+    )
+
+    def __init__(
+        self,
+        target_fps=60, # frames per second the renderer is aiming for
+        budget_fraction=0.75, # share of each frame the "max" speed may spend simulating
+        chunk_steps=256, # steps run between clock checks at "max" speed
+        max_steps_per_frame=100000 # cap for fixed speeds so a long stall doesn't trigger a huge catch-up
+    ):
+        self.target_fps = target_fps
+        self.budget_fraction = budget_fraction
+        self.chunk_steps = chunk_steps
+        self.max_steps_per_frame = max_steps_per_frame
+
+        self.speed_index = 0
+        self.accumulated_steps = 0.0
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    def get_speed_label(self):
+        return self.speeds[self.speed_index][0]
+
+    def get_steps_per_second(self):
+        return self.speeds[self.speed_index][1]
+
+    # Move on to the next speed, wrapping back around to 1x
+    def next_speed(self):
+        self.speed_index = (self.speed_index + 1) % len(self.speeds)
+        self.accumulated_steps = 0.0
+
+    ###### ~~~~~~~~~~~~~~~~~ ######
+    ###### Frame Functions ######
+    ###### ~~~~~~~~~~~~~~~~~ ######
+
+    # How many steps a fixed speed owes after dt_ms milliseconds, leftover fractions carry over to the next frame
+    def steps_for_frame(self, dt_ms):
+        self.accumulated_steps += dt_ms * self.get_steps_per_second() / 1000.0
+        num_steps = min(int(self.accumulated_steps), self.max_steps_per_frame)
+        self.accumulated_steps = min(self.accumulated_steps - num_steps, 1.0)
+        return num_steps
+
+    # Run this frame's share of steps through run_steps(num_steps), returns how many were taken
+    def run_frame(self, run_steps, dt_ms):
+        if self.get_steps_per_second() is not None:
+            num_steps = self.steps_for_frame(dt_ms)
+            if num_steps > 0:
+                run_steps(num_steps)
+            return num_steps
+
+        # As fast as possible: keep going in chunks until this frame's budget runs out
+        budget = self.budget_fraction / self.target_fps
+        start = time.perf_counter()
+        num_steps = 0
+        while time.perf_counter() - start < budget:
+            run_steps(self.chunk_steps)
+            num_steps += self.chunk_steps
+        return num_steps
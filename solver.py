@@ -0,0 +1,127 @@
+import numpy as np
+from board import TILE_CODES, ACTION_OFFSETS
+
+# Exact answers for a Board, to check learners against: shortest paths by BFS and the optimal Q-table by value iteration.
+# Transitions into the goal are treated as terminal, so nothing is bootstrapped past the goal.
+
+# Build the transition model of a board as arrays of shape (total_states, total_actions): next state, reward, and whether it ends the episode
+def build_model(board):
+    return board.next_states, board.transition_rewards.astype(float), board.transition_done
+
+# Fewest moves from every state to the goal (-1 where the goal can't be reached), found by a BFS outwards from the goal
+def shortest_distances(board):
+    map_size = board.map_size
+    flat_tiles = board.tiles.ravel()
+    passable = flat_tiles == TILE_CODES['floor']
+    distances = np.full(board.total_states, -1, dtype=np.int64)
+
+    frontier = np.flatnonzero(flat_tiles == TILE_CODES['goal'])
+    distances[frontier] = 0
+    distance = 0
+    while frontier.size:
+        distance += 1
+        rows, cols = np.divmod(frontier, map_size)
+
+        # Every floor tile next to the frontier that hasn't been reached yet is one move further out
+        neighbors = []
+        for d_row, d_col in ACTION_OFFSETS:
+            new_rows = rows + d_row
+            new_cols = cols + d_col
+            inside = (new_rows >= 0) & (new_rows < map_size) & (new_cols >= 0) & (new_cols < map_size)
+            neighbors.append(new_rows[inside] * map_size + new_cols[inside])
+        neighbors = np.unique(np.concatenate(neighbors))
+        neighbors = neighbors[passable[neighbors] & (distances[neighbors] < 0)]
+
+        distances[neighbors] = distance
+        frontier = neighbors
+    return distances
+
+# Length of the shortest path from the start (or another location) to the goal, None if there isn't one
+def shortest_path_length(board, location=None, distances=None):
+    if location is None:
+        location = board.start_location
+    if distances is None:
+        distances = shortest_distances(board)
+    distance = int(distances[board.location_to_state(location)])
+    return distance if distance >= 0 else None
+
+# Closed-form optimal state values from BFS distances, or None if the board's rewards don't allow it
+# Holds when every step costs something, bumping a wall costs at least as much as a step, and the goal is worth more than wandering forever
+def values_from_distances(board, rewards_rate, distances=None):
+    floor_reward = board.weight_map['floor']
+    wall_reward = board.weight_map['wall']
+    goal_reward = board.weight_map['goal']
+    if not (floor_reward <= 0 and wall_reward <= floor_reward and goal_reward > floor_reward / (1.0 - rewards_rate)):
+        return None
+    if distances is None:
+        distances = shortest_distances(board)
+
+    # Stuck somewhere without a path: wander the floor forever, or bump walls forever if there's nowhere to step
+    flat_tiles = board.tiles.ravel()
+    floor_next = flat_tiles[board.next_states] == TILE_CODES['floor']
+    moves_on_floor = (floor_next & (board.next_states != np.arange(board.total_states)[:, None])).any(axis=1)
+    values = np.where(moves_on_floor, floor_reward, wall_reward) / (1.0 - rewards_rate)
+
+    # d - 1 steps across the floor and then the goal
+    reachable = (distances > 0) & (flat_tiles == TILE_CODES['floor'])
+    discount = rewards_rate ** (distances[reachable] - 1).astype(float)
+    values[reachable] = floor_reward * (1.0 - discount) / (1.0 - rewards_rate) + goal_reward * discount
+    values[flat_tiles != TILE_CODES['floor']] = 0.0
+    return values
+
+# Optimal Q-table by vectorized value iteration, returns (Q, iterations)
+# With warm_start the values start from the BFS closed form where it applies, which leaves only a couple of sweeps to confirm it
+def value_iteration(board, rewards_rate=0.9, tolerance=1e-9, max_iterations=10000, warm_start=True):
+    next_states, rewards, dones = build_model(board)
+
+    # Column-major copies so each action is one contiguous gather
+    next_by_action = np.ascontiguousarray(next_states.T)
+    rewards_by_action = np.ascontiguousarray(rewards.T)
+    continues = np.ascontiguousarray(~dones.T)
+
+    values = values_from_distances(board, rewards_rate) if warm_start else None
+    if values is None:
+        values = np.zeros(board.total_states, dtype=float)
+
+    # The player only ever stands on floor, so walls and the goal keep a value of 0
+    standable = board.tiles.ravel() == TILE_CODES['floor']
+
+    Q_by_action = np.empty((board.total_actions, board.total_states), dtype=float)
+    for iteration in range(1, max_iterations + 1):
+        for action in range(board.total_actions):
+            np.multiply(values[next_by_action[action]], continues[action], out=Q_by_action[action])
+            Q_by_action[action] *= rewards_rate
+            Q_by_action[action] += rewards_by_action[action]
+        new_values = Q_by_action.max(axis=0)
+        new_values *= standable
+        change = np.abs(new_values - values).max()
+        values = new_values
+        if change < tolerance:
+            break
+    return np.ascontiguousarray(Q_by_action.T), iteration
+
+# Follow the learner's greedy policy from the start (without moving the player), returns the number of steps it takes to reach the goal
+# or None if it never does. The board is deterministic, so coming back to a state means the policy is going in circles.
+def greedy_path_length(board, learner, location=None):
+    if location is None:
+        location = board.start_location
+    state = board.location_to_state(location)
+    visited = set()
+    steps = 0
+    while state not in visited:
+        visited.add(state)
+        action = int(np.argmax(learner.Q_table[state]))
+        steps += 1
+        if board.transition_done[state, action]:
+            return steps
+        state = board.next_states.item(state, action)
+    return None
+
+# How many more steps the learner's greedy path takes than the shortest path, None if the greedy path never reaches the goal
+def regret(board, learner, optimal_length=None):
+    if optimal_length is None:
+        optimal_length = shortest_path_length(board)
+    greedy_length = greedy_path_length(board, learner)
+    if greedy_length is None or optimal_length is None:
+        return None
+    return greedy_length - optimal_length
@@ -0,0 +1,116 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from board import Board
+from learner import Q_Learner
+from trainer import Trainer
+from solver import greedy_path_length
+from maze import generate_for_board
+
+# Columns of the results table, in order
+RESULT_FIELDS = (
+    'learning_rate', 'rewards_rate', 'exploration_rate', 'exploration_rate_decay', 'seed',
+    'episodes_to_convergence', 'mean_steps_per_episode', 'final_steps_per_episode', 'greedy_path_length', 'wall_time'
+)
+
+# Build every combination of the settings, or a random sample of them if num_samples is given
+def build_configs(learning_rates, rewards_rates, exploration_rates, exploration_rate_decays, seeds, num_samples=None, sample_seed=None):
+    grid = list(itertools.product(learning_rates, rewards_rates, exploration_rates, exploration_rate_decays))
+    if num_samples is not None and num_samples < len(grid):
+        grid = random.Random(sample_seed).sample(grid, num_samples)
+
+    configs = []
+    for (learning_rate, rewards_rate, exploration_rate, exploration_rate_decay), seed in itertools.product(grid, seeds):
+        configs.append({
+            'learning_rate': learning_rate,
+            'rewards_rate': rewards_rate,
+            'exploration_rate': exploration_rate,
+            'exploration_rate_decay': exploration_rate_decay,
+            'seed': seed
+        })
+    return configs
+
+# Train one learner on the solvable maze generated from config['seed'] and measure how it did
+def run_config(config, map_size=10, wall_rate=0.25, episodes=200, max_steps=1000, convergence_threshold=1e-3):
+    start = time.perf_counter()
+
+    board = Board(map_size=map_size)
+    generate_for_board(board, wall_rate=wall_rate, seed=config['seed'])
+    learner = Q_Learner(
+        board.total_states, board.total_actions,
+        inp_learning_rate_OPT=config['learning_rate'],
+        inp_rewards_rate_OPT=config['rewards_rate'],
+        inp_exploration_rate_OPT=config['exploration_rate'],
+        inp_exploration_rate_decay_OPT=config['exploration_rate_decay'],
+        inp_seed_OPT=config['seed']
+    )
+
+    stats = Trainer(board, learner, max_steps=max_steps).run_episodes(episodes)
+
+    # First episode that reached the goal with the Q-table barely changing
+    episodes_to_convergence = None
+    for episode in stats:
+        if episode['reached_goal'] and episode['convergence'] < convergence_threshold:
+            episodes_to_convergence = episode['episode']
+            break
+
+    steps = [episode['steps'] for episode in stats]
+    final_steps = steps[-10:]
+
+    result = dict(config)
+    result['episodes_to_convergence'] = episodes_to_convergence
+    result['mean_steps_per_episode'] = sum(steps) / len(steps)
+    result['final_steps_per_episode'] = sum(final_steps) / len(final_steps)
+    result['greedy_path_length'] = greedy_path_length(board, learner)
+    result['wall_time'] = time.perf_counter() - start
+    return result
+
+def run_config_args(args):
+    return run_config(*args)
+
+# Fan the configs out across a process pool, returns the results in the same order as the configs
+def run_sweep(configs, map_size=10, wall_rate=0.25, episodes=200, max_steps=1000, convergence_threshold=1e-3, workers=None):
+    jobs = [(config, map_size, wall_rate, episodes, max_steps, convergence_threshold) for config in configs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_config_args, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+
+def write_results(results, path):
+    with open(path, 'w', newline='') as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+def parse_floats(text):
+    return [float(value) for value in text.split(',')]
+
+def parse_ints(text):
+    return [int(value) for value in text.split(',')]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sweep Q-learner settings over a set of seeded mazes")
+    parser.add_argument("--learning-rates", type=parse_floats, default=[0.1, 0.2, 0.5], help="comma separated learning rates")
+    parser.add_argument("--rewards-rates", type=parse_floats, default=[0.8, 0.9, 0.99], help="comma separated rewards rates")
+    parser.add_argument("--exploration-rates", type=parse_floats, default=[0.5], help="comma separated starting exploration rates")
+    parser.add_argument("--exploration-rate-decays", type=parse_floats, default=[0.99, 0.999], help="comma separated exploration rate decays")
+    parser.add_argument("--seeds", type=parse_ints, default=[0, 1, 2, 3], help="comma separated maze seeds")
+    parser.add_argument("--samples", type=int, default=None, help="randomly sample this many settings instead of the full grid")
+    parser.add_argument("--map-size", type=int, default=10)
+    parser.add_argument("--wall-rate", type=float, default=0.25, help="share of floor tiles turned into walls")
+    parser.add_argument("--episodes", type=int, default=200, help="episodes to train each learner for")
+    parser.add_argument("--max-steps", type=int, default=1000, help="steps before an episode is cut short")
+    parser.add_argument("--convergence-threshold", type=float, default=1e-3, help="Q-table MSE below which an episode counts as converged")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use, defaults to every core")
+    parser.add_argument("--output", default="sweep_results.csv", help="where to write the results table")
+    args = parser.parse_args()
+
+    configs = build_configs(args.learning_rates, args.rewards_rates, args.exploration_rates, args.exploration_rate_decays, args.seeds, args.samples)
+    print(f"Running {len(configs)} configurations on {args.workers or os.cpu_count()} workers")
+
+    start = time.perf_counter()
+    results = run_sweep(configs, args.map_size, args.wall_rate, args.episodes, args.max_steps, args.convergence_threshold, args.workers)
+    write_results(results, args.output)
+    print(f"Wrote {len(results)} results to {args.output} in {time.perf_counter() - start:.1f}s")
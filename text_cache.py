@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+class TextCache:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Keeps rendered text surfaces around so the same string isn't rasterized again every frame.
+    # Surfaces are keyed by (text, font, color, antialias), and the least recently used one is dropped once the cache is full.
+
+    def __init__(
+        self,
+        max_entries=4096 # positive int - how many rendered surfaces to keep
+    ):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+
+        # Counters to check the cache is doing its job
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Same as font.render(text, antialias, color), but returns the cached surface when there is one
+    def render(self, font, text, color, antialias=True):
+        key = (text, font, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    # Hit/miss counters and the current size of the cache
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.surfaces),
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __str__(self):
+        stats = self.get_stats()
+        return f"Text cache: {stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses, {stats['hit_rate']:.1%} hit rate"
+
+
+# One cache shared by the boards and the HUD
+shared_text_cache = TextCache()
@@ -0,0 +1,179 @@
+from solver import greedy_path_length, shortest_path_length
+
+# Episodes are cut short after this many steps per state on the map unless Trainer is given its own max_steps,
+# so a learner stuck in a corner it can't find its way out of still gets a fresh start now and then
+DEFAULT_MAX_STEPS_PER_STATE = 10
+
+class Trainer:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Runs a Q_Learner against a Board as fast as the CPU allows, with no pygame involved.
+    # The GUI can hand it a chunk of steps each frame with run_steps(), scripts can just call train().
+
+    def __init__(
+        self,
+        board, # Board the learner explores (its player location is moved by training)
+        learner, # Q_Learner being trained
+        max_steps=None, # Steps before an episode is cut short (truncated) and the player is sent back to the start,
+                        # None for DEFAULT_MAX_STEPS_PER_STATE * the board's states, 0 for no cap
+        start_location=None, # Where the player is placed at the start of each episode, defaults to the board's start
+        replay_batch_size=None, # If passed, replay this many saved transitions after every step (the learner needs a replay buffer)
+        recorder=None # If passed, every step is recorded to this TraceRecorder (see episode_trace.py)
+    ):
+        self.board = board
+        self.learner = learner
+        self.max_steps = max_steps if max_steps is not None else DEFAULT_MAX_STEPS_PER_STATE * board.total_states
+        self.start_location = start_location if start_location is not None else board.start_location
+        self.replay_batch_size = replay_batch_size
+        self.recorder = recorder
+
+        # Per-episode counters
+        self.num_episodes = 0
+        self.num_steps = 0
+        self.episode_return = 0
+        self.convergence = 0
+
+        # Last transition, kept so the GUI can show what just happened
+        self.state = None
+        self.action = None
+        self.reward = None
+        self.state_weight = None
+        self.direction = None
+        self.reached_state = None # where the last step landed, kept even when that step ended the episode
+
+        self.first_step = True
+        return
+
+    ###### ~~~~~~~~~~~~~~~~ ######
+    ###### Helper Functions ######
+    ###### ~~~~~~~~~~~~~~~~ ######
+
+    # Discretize the player location on the board into a single state index
+    def get_state(self):
+        return self.board.get_state()
+
+    # Put the player back at the start and clear the per-episode counters
+    def reset_episode(self):
+        self.board.set_player_location(self.start_location)
+        self.num_episodes += 1
+        self.num_steps = 0
+        self.episode_return = 0
+
+    # Wrap up the current episode and return its stats, an episode that hit the step cap instead of the goal is 'truncated'
+    def end_episode(self, reached_goal):
+        if self.recorder is not None:
+            self.recorder.end_episode(self.num_episodes)
+        self.convergence = self.learner.get_convergence()
+        self.learner.reset_convergence()
+        stats = {
+            'episode': self.num_episodes,
+            'steps': self.num_steps,
+            'return': self.episode_return,
+            'convergence': float(self.convergence),
+            'reached_goal': reached_goal,
+            'truncated': not reached_goal
+        }
+        return stats
+
+    # Episode counters, e.g. to save in a checkpoint ('episode' is the one in progress, or the next one if it hasn't started)
+    def get_counters(self):
+        episode = self.num_episodes + 1 if self.first_step else self.num_episodes
+        return {'episode': episode, 'step': self.num_steps, 'convergence': float(self.convergence)}
+
+    # Carry on from saved counters, the episode that was in progress starts over
+    def set_counters(self, counters):
+        self.num_episodes = max(0, counters.get('episode', 1) - 1)
+        self.convergence = counters.get('convergence', 0)
+        self.first_step = True
+
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+    ###### Training Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+
+    # Take a single training step, returns the stats of the episode if this step finished one, otherwise None
+    def step(self):
+
+        # First step, we don't have anything yet. Set our initial state and get an action back
+        if self.first_step:
+            self.first_step = False
+            self.start_episode()
+            return None
+
+        # Take the action, and pass the new state and reward from that state to the learner, it will return a new action to take based on that
+        new_state, self.reward, done = self.board.step(self.action)
+        self.state_weight = self.learner.get_q_table(inp_state_OPT=self.state, inp_action_OPT=self.action)
+        self.direction = (self.action + 2) % 4
+        if self.recorder is not None:
+            self.recorder.record(self.num_episodes, self.num_steps + 1, self.state, self.action, self.reward)
+
+        self.action = self.learner.train_step(inp_new_state=new_state, inp_reward=self.reward, inp_done_OPT=done)
+        self.state = new_state
+        self.reached_state = new_state
+        if self.replay_batch_size is not None:
+            self.learner.replay(self.replay_batch_size)
+
+        self.num_steps += 1
+        self.episode_return += self.reward
+
+        stats = None
+        if done: # We won the round
+            stats = self.end_episode(reached_goal=True)
+            self.start_episode()
+        elif self.max_steps and self.num_steps >= self.max_steps: # Took too long, start over
+            stats = self.end_episode(reached_goal=False)
+            self.start_episode()
+
+        return stats
+
+    # Put the player at the start of a new episode and pick its first action
+    def start_episode(self):
+        self.reset_episode()
+        self.state = self.get_state()
+        self.action = self.learner.start_episode(self.state)
+
+    # Take a chunk of training steps, returns the stats for every episode finished along the way
+    def run_steps(self, num_steps):
+        finished = []
+        for _ in range(num_steps):
+            stats = self.step()
+            if stats is not None:
+                finished.append(stats)
+        return finished
+
+    # Train until the learner's greedy path is as short as the shortest path, checking every check_every episodes
+    # Returns the stats for every episode, the checked ones also hold 'greedy_steps' and 'regret' (extra steps over the shortest path)
+    def run_until_optimal(self, max_episodes, check_every=1):
+        optimal_length = shortest_path_length(self.board, self.start_location)
+        finished = []
+        while len(finished) < max_episodes:
+            stats = self.step()
+            if stats is None:
+                continue
+            finished.append(stats)
+
+            if optimal_length is not None and len(finished) % check_every == 0:
+                greedy_steps = greedy_path_length(self.board, self.learner, self.start_location)
+                stats['greedy_steps'] = greedy_steps
+                stats['regret'] = greedy_steps - optimal_length if greedy_steps is not None else None
+                if greedy_steps == optimal_length:
+                    break
+        return finished
+
+    # Train until a number of episodes have finished, returns the stats for each of them
+    def run_episodes(self, num_episodes):
+        finished = []
+        while len(finished) < num_episodes:
+            stats = self.step()
+            if stats is not None:
+                finished.append(stats)
+        return finished
+
+
+# Train a learner on a board for a number of episodes as fast as possible, returns a list of per-episode stats
+def train(board, learner, episodes, max_steps=None, start_location=None, replay_batch_size=None):
+    trainer = Trainer(board, learner, max_steps=max_steps, start_location=start_location, replay_batch_size=replay_batch_size)
+    return trainer.run_episodes(episodes)
+
@@ -0,0 +1,175 @@
+import numpy as np
+from board import TILE_CODES, ACTION_OFFSETS, DEFAULT_WEIGHT_MAP
+from trainer import DEFAULT_MAX_STEPS_PER_STATE
+
+class VectorEnv:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # N independent mazes, each with its own Q-table, stepped in lockstep.
+    # Mirrors Board.move_player + Q_Learner.train_step, but for every agent at once with a handful of NumPy ops.
+    # Like Board, every move is precomputed into per-map transition tables, so walls and the map edges behave the same.
+
+    def __init__(
+        self,
+        maps, # int array of shape (N, map_size, map_size) holding TILE_CODES, see maps_from_boards()
+        learning_rate=0.2, # scalar or array of shape (N,) - see Q_Learner.set_learner_preferences()
+        rewards_rate=0.9, # scalar or array of shape (N,)
+        exploration_rate=0.5, # scalar or array of shape (N,)
+        exploration_rate_decay=0.99, # scalar or array of shape (N,)
+        weight_map=None, # dict of tile name -> reward, defaults to DEFAULT_WEIGHT_MAP like a new Board
+        start_location=(1, 1), # where every agent starts and returns to after reaching the goal
+        max_steps=None, # steps before an agent's episode is truncated and it's sent back to the start, see Trainer
+        seed=None # seed for the random actions, None for a fresh seed
+    ):
+        maps = np.asarray(maps)
+        self.num_envs, self.map_size = maps.shape[0], maps.shape[1]
+        self.total_states = self.map_size * self.map_size
+        self.total_actions = len(ACTION_OFFSETS)
+
+        if weight_map is None:
+            weight_map = DEFAULT_WEIGHT_MAP
+        reward_lookup = np.zeros(len(TILE_CODES), dtype=float)
+        for tile, code in TILE_CODES.items():
+            reward_lookup[code] = weight_map[tile]
+
+        # Flatten each map so a position is just the state index row * map_size + col
+        self.tiles = maps.reshape(self.num_envs, self.total_states).astype(np.uint8)
+        self.start_state = start_location[0] * self.map_size + start_location[1]
+        self.build_transitions(reward_lookup)
+        self.max_steps = max_steps if max_steps is not None else DEFAULT_MAX_STEPS_PER_STATE * self.total_states
+
+        # Per-agent hyperparameters, broadcast so sweeps can give each agent its own values
+        self.learning_rate = np.broadcast_to(np.asarray(learning_rate, dtype=float), (self.num_envs,)).copy()
+        self.rewards_rate = np.broadcast_to(np.asarray(rewards_rate, dtype=float), (self.num_envs,)).copy()
+        self.exploration_rate = np.broadcast_to(np.asarray(exploration_rate, dtype=float), (self.num_envs,)).copy()
+        self.exploration_rate_decay = np.broadcast_to(np.asarray(exploration_rate_decay, dtype=float), (self.num_envs,)).copy()
+
+        self.Q_table = np.zeros((self.num_envs, self.total_states, self.total_actions), dtype=float)
+        self.rng = np.random.default_rng(seed)
+        self.random_block_size = 64
+        self.random_index = self.random_block_size
+        self.env_index = np.arange(self.num_envs)
+
+        # Flat views used by step(), agent i's states start at state_base[i]
+        self.state_base = self.env_index * self.total_states
+        self.flat_Q = self.Q_table.reshape(self.num_envs * self.total_states, self.total_actions)
+        self.Q_values = self.Q_table.ravel()
+
+        self.reset()
+        return
+
+    # Precompute every move on every map, the same way Board.assign_weights() does for a single map. Each table is flat,
+    # entry (state_base[i] + state) * total_actions + action is where agent i's move lands, what it earns, and whether it ends the episode.
+    def build_transitions(self, reward_lookup):
+        states = np.arange(self.total_states)
+        rows, cols = np.divmod(states, self.map_size)
+
+        next_states = np.empty((self.num_envs, self.total_states, self.total_actions), dtype=np.intp)
+        rewards = np.empty((self.num_envs, self.total_states, self.total_actions), dtype=float)
+        done = np.empty((self.num_envs, self.total_states, self.total_actions), dtype=bool)
+        for action, (d_row, d_col) in enumerate(ACTION_OFFSETS):
+            new_rows = rows + d_row
+            new_cols = cols + d_col
+
+            # Moving off the edge of the map counts as walking into a wall
+            inside = (new_rows >= 0) & (new_rows < self.map_size) & (new_cols >= 0) & (new_cols < self.map_size)
+            proposed = np.where(inside, new_rows * self.map_size + new_cols, states)
+            tile = np.where(inside, self.tiles[:, proposed], TILE_CODES['wall'])
+
+            # Walls leave the agent where it was, the goal sends it back to the start
+            next_state = np.where(tile == TILE_CODES['wall'], states, proposed)
+            next_state[tile == TILE_CODES['goal']] = self.start_state
+
+            next_states[:, :, action] = next_state
+            rewards[:, :, action] = reward_lookup[tile]
+            done[:, :, action] = tile == TILE_CODES['goal']
+
+        self.flat_next_states = next_states.ravel()
+        self.flat_transition_rewards = rewards.ravel()
+        self.flat_transition_done = done.ravel()
+
+    # Random numbers are drawn for many steps at once, one row per step
+    def draw_random_block(self):
+        self.random_uniforms = self.rng.random((self.random_block_size, self.num_envs))
+        self.random_actions = self.rng.integers(0, self.total_actions, size=(self.random_block_size, self.num_envs))
+        self.random_index = 0
+
+    # Put every agent back at the start, with the greedy first action just like Q_Learner.test_step()
+    def reset(self):
+        self.states = np.full(self.num_envs, self.start_state, dtype=np.intp)
+        self.actions = np.argmax(self.Q_table[self.env_index, self.states], axis=1)
+        self.episodes = np.zeros(self.num_envs, dtype=np.int64)
+        self.episode_steps = np.zeros(self.num_envs, dtype=np.int64)
+        self.last_episode_steps = np.zeros(self.num_envs, dtype=np.int64)
+        self.truncations = np.zeros(self.num_envs, dtype=np.int64)
+        self.total_steps = 0
+
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+    ###### Training Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~ ######
+
+    # Move every agent, update every Q-table, and pick every next action. Returns the rewards received.
+    def step(self):
+        # Work on flat views so every lookup is a single 1D fancy index
+        base = self.state_base
+        transitions = (base + self.states) * self.total_actions + self.actions
+
+        # Walls and the map edges bounce the agent back, the goal sends it back to the start
+        new_states = np.take(self.flat_next_states, transitions)
+        rewards = np.take(self.flat_transition_rewards, transitions)
+        reached_goal = np.take(self.flat_transition_done, transitions)
+
+        # Bellman update for the previous state and action of every agent, the goal is terminal so it has no future
+        # A transition's index is also the index of the Q-value of the state and action it came from
+        new_rows = np.take(self.flat_Q, base + new_states, axis=0)
+        best_future = np.maximum(np.maximum(new_rows[:, 0], new_rows[:, 1]), np.maximum(new_rows[:, 2], new_rows[:, 3]))
+        best_future[reached_goal] = 0.0
+        new_values = (1.0 - self.learning_rate) * np.take(self.Q_values, transitions) + self.learning_rate * (rewards + self.rewards_rate * best_future)
+        self.Q_values[transitions] = new_values
+
+        # Agents that bounced off a wall just updated the row they're choosing from, patch our copy of it
+        stayed = np.flatnonzero(new_states == self.states)
+        new_rows[stayed, self.actions[stayed]] = new_values[stayed]
+
+        # Epsilon-greedy choice of the next action (after the update, same as Q_Learner.train_step)
+        self.exploration_rate *= self.exploration_rate_decay
+        if self.random_index >= self.random_block_size:
+            self.draw_random_block()
+        explore = self.random_uniforms[self.random_index] < self.exploration_rate
+        actions = np.where(explore, self.random_actions[self.random_index], new_rows.argmax(axis=1))
+
+        # Episode bookkeeping
+        self.total_steps += 1
+        self.episode_steps += 1
+        self.last_episode_steps[reached_goal] = self.episode_steps[reached_goal]
+        self.episode_steps[reached_goal] = 0
+        self.episodes += reached_goal
+
+        # Agents that ran out of steps start over, choosing their next action from the start state instead
+        if self.max_steps:
+            truncated = np.flatnonzero(self.episode_steps >= self.max_steps)
+            if truncated.size:
+                new_states[truncated] = self.start_state
+                start_rows = np.take(self.flat_Q, base[truncated] + self.start_state, axis=0)
+                actions[truncated] = np.where(explore[truncated], self.random_actions[self.random_index, truncated], start_rows.argmax(axis=1))
+                self.episode_steps[truncated] = 0
+                self.truncations[truncated] += 1
+        self.random_index += 1
+
+        self.states = new_states
+        self.actions = actions
+
+        return rewards
+
+    # Take a number of steps for every agent
+    def run_steps(self, num_steps):
+        for _ in range(num_steps):
+            self.step()
+
+
+# Stack the maps of a list of same-sized Boards into an (N, map_size, map_size) array of tile codes
+def maps_from_boards(boards):
+    return np.stack([board.tiles for board in boards])
@@ -0,0 +1,211 @@
+import multiprocessing
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from board import Board
+from learner import Q_Learner
+from trainer import Trainer
+from episode_trace import TraceRecorder
+
+# Values the worker publishes after every chunk of steps, in this order, at the front of the shared memory block
+STATUS_FIELDS = ('episode', 'step', 'total_steps', 'convergence', 'exploration_rate', 'player_state', 'state_weight', 'direction')
+
+# The worker is always spawned: forking a process that has already started SDL and its threads isn't safe.
+# Spawning stays cheap because the worker only imports the NumPy side of the project, and main.py keeps its
+# window setup behind __name__ == '__main__'
+mp_context = multiprocessing.get_context('spawn')
+
+class TrainingWorker:
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Class variables / Constructor ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Trains a learner in a separate process so rendering and learning don't stall each other.
+    # The Q-table lives in shared memory: the worker writes it, and get_q_table() hands the GUI a zero-copy view of it.
+    # Commands ('start', 'stop', 'speed', 'quit') go to the worker over a pipe.
+
+    def __init__(
+        self,
+        board, # Board to train on, its tiles are copied to the worker when it launches
+        learner, # Q_Learner with a dense Q-table, its table and preferences seed the worker's learner
+        max_steps=None, # see Trainer
+        chunk_steps=1000, # steps the worker takes between checking for commands and publishing its status
+        counters=None, # episode counters to carry on from, see Trainer.get_counters()
+        trace_path=None # if passed, the worker records every step to this trace file (see episode_trace.py)
+    ):
+        if not isinstance(learner.Q_table, np.ndarray):
+            raise ValueError("The training worker needs a dense Q-table, sparse tables can't be shared")
+
+        self.board = board
+        self.learner = learner
+        self.max_steps = max_steps
+        self.chunk_steps = chunk_steps
+        self.counters = counters
+        self.trace_path = trace_path
+
+        # One block holds the status values followed by the Q-table
+        status_bytes = len(STATUS_FIELDS) * np.dtype(float).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=status_bytes + learner.Q_table.nbytes)
+        self.status = np.ndarray((len(STATUS_FIELDS),), dtype=float, buffer=self.shm.buf)
+        self.q_table = np.ndarray(learner.Q_table.shape, dtype=float, buffer=self.shm.buf, offset=status_bytes)
+        self.status[:] = 0
+        if counters is not None:
+            self.status[STATUS_FIELDS.index('episode')] = counters.get('episode', 0)
+        self.q_table[:] = learner.Q_table
+
+        self.process = None
+        self.connection = None
+        self.steps_per_second = None
+        return
+
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+    ###### Accessor and Mutator Functions ######
+    ###### ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ ######
+
+    # Zero-copy view of the Q-table the worker is training, values may change while you read them
+    # Only valid until close(), which hands the final table back to the learner the worker was made with
+    def get_q_table(self):
+        return self.q_table
+
+    # Latest status the worker published, as a dict of STATUS_FIELDS
+    def get_status(self):
+        return dict(zip(STATUS_FIELDS, self.status.tolist()))
+
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+
+    ###### ~~~~~~~~~~~~~~~~ ######
+    ###### Worker Control ######
+    ###### ~~~~~~~~~~~~~~~~ ######
+
+    # Launch the worker process if needed and start training
+    def start(self):
+        if self.process is None:
+            board_settings = {
+                'map_size': self.board.map_size,
+                'start_location': self.board.start_location,
+                'goal_location': self.board.goal_location
+            }
+            preferences = {
+                'learning_rate': self.learner.learning_rate,
+                'rewards_rate': self.learner.rewards_rate,
+                'exploration_rate': self.learner.exploration_rate,
+                'exploration_rate_decay': self.learner.exploration_rate_decay
+            }
+            self.connection, child_connection = mp_context.Pipe()
+            self.process = mp_context.Process(
+                target=worker_main,
+                args=(self.shm.name, self.board.tiles.copy(), board_settings, preferences, self.q_table.shape, self.max_steps, self.chunk_steps, self.counters, self.trace_path, child_connection),
+                daemon=True
+            )
+            self.process.start()
+            self.connection.send(('speed', self.steps_per_second))
+        self.connection.send(('start', None))
+
+    # Pause training, the worker keeps its state and waits for the next start
+    def stop(self):
+        if self.connection is not None:
+            self.connection.send(('stop', None))
+
+    # Limit the worker to a number of steps per second, None to go as fast as possible
+    def set_speed(self, steps_per_second):
+        self.steps_per_second = steps_per_second
+        if self.connection is not None:
+            self.connection.send(('speed', steps_per_second))
+
+    # Shut the worker down and release the shared memory
+    def close(self):
+        if self.process is not None:
+            self.connection.send(('quit', None))
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+
+        # Drop our views before closing, numpy arrays can't outlive the buffer. A learner reading the shared table
+        # (main.py installs get_q_table() as its Q_table) gets the final copy instead of a view of unmapped memory.
+        self.q_table = self.q_table.copy()
+        self.status = self.status.copy()
+        if isinstance(self.learner.Q_table, np.ndarray) and np.shares_memory(self.learner.Q_table, self.shm.buf):
+            self.learner.Q_table = self.q_table
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Entry point of the worker process
+def worker_main(shm_name, tiles, board_settings, preferences, q_shape, max_steps, chunk_steps, counters, trace_path, connection):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    status_bytes = len(STATUS_FIELDS) * np.dtype(float).itemsize
+    status = np.ndarray((len(STATUS_FIELDS),), dtype=float, buffer=shm.buf)
+
+    board = Board(**board_settings)
+    board.set_game_map(tiles)
+
+    # Train straight into the shared table
+    learner = Q_Learner(
+        q_shape[0], q_shape[1],
+        inp_learning_rate_OPT=preferences['learning_rate'],
+        inp_rewards_rate_OPT=preferences['rewards_rate'],
+        inp_exploration_rate_OPT=preferences['exploration_rate'],
+        inp_exploration_rate_decay_OPT=preferences['exploration_rate_decay']
+    )
+    learner.Q_table = np.ndarray(q_shape, dtype=float, buffer=shm.buf, offset=status_bytes)
+    recorder = TraceRecorder(trace_path, board) if trace_path is not None else None
+    trainer = Trainer(board, learner, max_steps=max_steps, recorder=recorder)
+    if counters is not None:
+        trainer.set_counters(counters)
+
+    running = False
+    steps_per_second = None
+    total_steps = 0
+    while True:
+
+        # Block while paused, otherwise just check for new commands between chunks
+        if not running or connection.poll():
+            try:
+                command, value = connection.recv()
+            except EOFError: # The GUI went away without saying goodbye
+                break
+            if command == 'start':
+                running = True
+            elif command == 'stop':
+                running = False
+            elif command == 'speed':
+                steps_per_second = value
+            elif command == 'quit':
+                break
+            continue
+
+        chunk_start = time.perf_counter()
+        if steps_per_second is None:
+            num_steps = chunk_steps
+        else:
+            num_steps = max(1, min(chunk_steps, int(steps_per_second / 100)))
+        trainer.run_steps(num_steps)
+        total_steps += num_steps
+
+        status[:] = (
+            trainer.num_episodes,
+            trainer.num_steps,
+            total_steps,
+            trainer.convergence,
+            learner.exploration_rate,
+            board.get_state(),
+            trainer.state_weight if trainer.state_weight is not None else np.nan,
+            trainer.direction if trainer.direction is not None else -1
+        )
+
+        # Pace ourselves when a speed is set
+        if steps_per_second is not None:
+            remaining = num_steps / steps_per_second - (time.perf_counter() - chunk_start)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    if recorder is not None:
+        recorder.close()
+
+    # Let go of the shared buffer before closing it
+    del learner.Q_table
+    del status
+    shm.close()